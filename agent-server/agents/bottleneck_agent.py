@@ -6,7 +6,9 @@ from langchain_core.messages import AIMessage
 from agents.state import AgentState
 from database.connection import database
 from database.models import BottleneckType, BottleneckSeverity, OrderStatus
+from cache import async_ttl_cache, invalidate
 from datetime import datetime, timedelta
+import asyncio
 
 
 async def bottleneck_agent(state: AgentState) -> AgentState:
@@ -27,29 +29,21 @@ async def bottleneck_agent(state: AgentState) -> AgentState:
     return state
 
 
+@async_ttl_cache(ttl=30, reads=("bottlenecks",))
 async def comprehensive_analysis() -> str:
-    """Perform comprehensive bottleneck analysis."""
-    bottlenecks = []
-    
-    # Check order backlog
-    order_bottleneck = await check_order_backlog()
-    if order_bottleneck:
-        bottlenecks.append(order_bottleneck)
-    
-    # Check inventory issues
-    inventory_bottleneck = await check_inventory_issues()
-    if inventory_bottleneck:
-        bottlenecks.append(inventory_bottleneck)
-    
-    # Check workload issues
-    workload_bottleneck = await check_workload_issues()
-    if workload_bottleneck:
-        bottlenecks.append(workload_bottleneck)
+    """
+    Perform comprehensive bottleneck analysis.
     
-    # Check supplier delays
-    supplier_bottleneck = await check_supplier_delays()
-    if supplier_bottleneck:
-        bottlenecks.append(supplier_bottleneck)
+    Re-runs at most every 30s; callers in between get the last report.
+    """
+    # Order backlog, inventory, workload and supplier checks are independent reads
+    checks = await asyncio.gather(
+        check_order_backlog(),
+        check_inventory_issues(),
+        check_workload_issues(),
+        check_supplier_delays()
+    )
+    bottlenecks = [bn for bn in checks if bn]
     
     if not bottlenecks:
         return "✅ No operational bottlenecks detected. Operations running smoothly."
@@ -68,6 +62,7 @@ async def comprehensive_analysis() -> str:
             bn["detected_at"] = datetime.utcnow()
             bn["is_resolved"] = False
             await bottlenecks_collection.insert_one(bn)
+            invalidate("bottlenecks")
     
     # Format response
     lines = ["⚠️ Operational Bottlenecks Detected:", ""]
@@ -133,7 +128,7 @@ async def check_inventory_issues() -> dict | None:
     
     # Count low stock items
     low_stock = await products_collection.count_documents({
-        "$expr": {"$lte": ["$quantity", "$low_stock_threshold"]},
+        "is_low_stock": True,
         "quantity": {"$gt": 0}
     })
     
@@ -245,6 +240,7 @@ async def resolve_bottleneck(bottleneck_id: str) -> str:
     )
     
     if result.modified_count > 0:
+        invalidate("bottlenecks")
         return f"Bottleneck {bottleneck_id} marked as resolved."
     return f"Bottleneck {bottleneck_id} not found."
 
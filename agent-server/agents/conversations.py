@@ -0,0 +1,28 @@
+"""
+Conversation history reads shared by the agents and chat routes.
+"""
+
+from database.connection import database
+from cache import async_lru_cache
+
+
+@async_lru_cache(maxsize=2048, ttl=30)
+async def get_conversation_history(conversation_id: str) -> dict | None:
+    """Get conversation history by ID (cached; writers must invalidate)."""
+    conversations_collection = database.get_collection("conversations")
+    
+    conversation = await conversations_collection.find_one({
+        "conversation_id": conversation_id
+    })
+    
+    if conversation:
+        conversation["_id"] = str(conversation["_id"])
+    
+    return conversation
+
+
+def invalidate_conversation_history(*conversation_ids: str | None):
+    """Drop cached history for conversations that were just written to."""
+    for conversation_id in conversation_ids:
+        if conversation_id:
+            get_conversation_history.cache_invalidate(conversation_id)
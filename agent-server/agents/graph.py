@@ -13,6 +13,7 @@ from agents.order_agent import order_agent
 from agents.workload_agent import workload_agent
 from agents.bottleneck_agent import bottleneck_agent
 from database.connection import database
+from agents.conversations import invalidate_conversation_history
 from datetime import datetime
 import uuid
 
@@ -216,6 +217,8 @@ async def save_conversation(
         },
         upsert=True
     )
+    
+    invalidate_conversation_history(conversation_id)
 
 
 async def log_activity(
@@ -239,17 +242,3 @@ async def log_activity(
     }
     
     await activities_collection.insert_one(activity)
-
-
-async def get_conversation_history(conversation_id: str) -> dict | None:
-    """Get conversation history by ID."""
-    conversations_collection = database.get_collection("conversations")
-    
-    conversation = await conversations_collection.find_one({
-        "conversation_id": conversation_id
-    })
-    
-    if conversation:
-        conversation["_id"] = str(conversation["_id"])
-    
-    return conversation
@@ -6,7 +6,10 @@ from langchain_core.messages import AIMessage
 from agents.state import AgentState
 from database.connection import database
 from database.models import BottleneckType, BottleneckSeverity
+from database.queries import stock_change_update
+from cache import invalidate
 from datetime import datetime
+from pymongo import UpdateOne
 
 
 async def inventory_agent(state: AgentState) -> AgentState:
@@ -73,11 +76,13 @@ async def reserve_stock(state: AgentState) -> str:
     
     products_collection = database.get_collection("products")
     
-    for item in current_order.get("items", []):
-        await products_collection.update_one(
-            {"_id": item["product_id"]},
-            {"$inc": {"quantity": -item["quantity"]}}
-        )
+    reservations = [
+        UpdateOne({"_id": item["product_id"]}, stock_change_update(-item["quantity"]))
+        for item in current_order.get("items", [])
+    ]
+    if reservations:
+        await products_collection.bulk_write(reservations, ordered=False)
+        invalidate("products")
     
     # Check for low stock and create bottleneck if needed
     await check_low_stock_bottlenecks()
@@ -97,8 +102,9 @@ async def update_stock_level(state: AgentState) -> str:
     products_collection = database.get_collection("products")
     await products_collection.update_one(
         {"_id": product_id},
-        {"$inc": {"quantity": quantity_change}}
+        stock_change_update(quantity_change)
     )
+    invalidate("products")
     
     return f"Stock updated by {quantity_change}."
 
@@ -108,7 +114,7 @@ async def get_low_stock_items() -> list:
     products_collection = database.get_collection("products")
     
     low_stock = await products_collection.find({
-        "$expr": {"$lte": ["$quantity", "$low_stock_threshold"]}
+        "is_low_stock": True
     }).to_list(100)
     
     return low_stock
@@ -148,6 +154,7 @@ async def check_low_stock_bottlenecks():
                 }
                 
                 await bottlenecks_collection.insert_one(bottleneck)
+                invalidate("bottlenecks")
 
 
 async def get_product_availability(product_name: str) -> dict:
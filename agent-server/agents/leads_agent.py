@@ -10,11 +10,14 @@ from typing import Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from database.connection import database
+import functools
 import os
+import re
 
 
+@functools.lru_cache(maxsize=1)
 def get_llm():
-    """Get the Gemini LLM instance."""
+    """Get the shared Gemini LLM instance (built on first use)."""
     return ChatGoogleGenerativeAI(
         model="gemini-2.5-flash",
         google_api_key=os.getenv("GEMINI_API_KEY"),
@@ -22,6 +25,48 @@ def get_llm():
     )
 
 
+# Decision tags the model ends a qualifying reply with, highest precedence first
+_DECISION_TAGS = ("QUALIFIED", "NOT_QUALIFIED", "POTENTIAL_YES", "POTENTIAL_NO")
+_DECISION_TAG_RE = re.compile(r"\[(QUALIFIED|NOT_QUALIFIED|POTENTIAL_YES|POTENTIAL_NO)\]")
+_QUALIFIED_TAGS = frozenset({"QUALIFIED", "POTENTIAL_YES"})
+
+
+# Static parts of the send_message prompt
+_DECISION_CRITERIA = """Analyze the conversation and determine if this person is a POTENTIAL LEAD or NOT.
+
+Signs of potential lead:
+- Asking questions about the product/service
+- Showing interest or curiosity
+- Wanting to know pricing, features, or details
+- Agreeing to a demo or follow-up call
+- Positive or engaged responses
+
+Signs of NOT a lead:
+- Short dismissive responses
+- Clearly not interested
+- Wrong person/industry fit
+- No engagement
+
+"""
+
+_DECISION_CLOSING = """
+
+Respond with a brief closing message, and you MUST end with either [QUALIFIED] or [NOT_QUALIFIED].
+Example: "Thank you for your interest! I'll have our team reach out with more details. [QUALIFIED]"
+Or: "I understand this isn't a priority for you right now. Thank you for your time! [NOT_QUALIFIED]"
+
+Your response:"""
+
+_QUALIFYING_INSTRUCTIONS = """
+Instructions:
+1. Ask ONE quick qualifying question
+2. Keep it to 1-2 sentences max
+3. Try to gauge their interest level quickly
+4. We need to qualify them within 3-4 total messages
+
+"""
+
+
 # Global state for leads conversations (per-session, will be stored in DB)
 leads_state = {
     "leads": [],
@@ -169,20 +214,23 @@ Please reply with 'CONTINUE' to proceed or 'STOP' to end this conversation."""
 
 async def send_message(lead_id: str, user_message: str) -> dict:
     """Process user message and get AI response. Qualifies within 3-4 messages."""
-    if lead_id not in leads_state["conversation_history"]:
+    # Look up this lead's history once; the list is updated in place
+    history = leads_state["conversation_history"].get(lead_id)
+    if history is None:
         return {"success": False, "message": "Invalid conversation"}
     
     # Add user message to history
-    leads_state["conversation_history"][lead_id].append({
+    history.append({
         "role": "user",
         "content": user_message
     })
     
     # Count user messages (excluding initial agent message)
-    user_message_count = len([m for m in leads_state["conversation_history"][lead_id] if m["role"] == "user"])
+    user_message_count = sum(1 for m in history if m["role"] == "user")
     
     # Check if user wants to stop
-    if "STOP" in user_message.upper():
+    message_upper = user_message.upper()
+    if "STOP" in message_upper:
         leads_state["current_index"] += 1
         
         # Update lead status in DB
@@ -201,7 +249,7 @@ async def send_message(lead_id: str, user_message: str) -> dict:
     
     # Check if this is the first response (CONTINUE/STOP check)
     if user_message_count == 1:
-        if "CONTINUE" not in user_message.upper():
+        if "CONTINUE" not in message_upper:
             leads_state["current_index"] += 1
             return {
                 "success": True,
@@ -214,7 +262,8 @@ async def send_message(lead_id: str, user_message: str) -> dict:
     lead = leads_state["leads"][leads_state["current_index"]]
     
     # Build conversation context - for quick qualification
-    conversation_context = f"""You are a sales agent analyzing a potential customer. Your context: {leads_state['sales_context']}
+    parts = [
+        f"""You are a sales agent analyzing a potential customer. Your context: {leads_state['sales_context']}
 
 You are talking to:
 Name: {lead.get('name')}
@@ -226,47 +275,28 @@ Message count: {user_message_count} (You MUST make a decision by message 3-4)
 
 Conversation history:
 """
-    for msg in leads_state["conversation_history"][lead_id]:
-        role = "Agent" if msg["role"] == "agent" else "Client"
-        conversation_context += f"{role}: {msg['content']}\n"
+    ]
+    parts.extend(
+        f"{'Agent' if msg['role'] == 'agent' else 'Client'}: {msg['content']}\n"
+        for msg in history
+    )
     
     # Force decision by message 3-4
     if user_message_count >= 3:
-        conversation_context += f"""
-CRITICAL: This is message {user_message_count}. You MUST make a final decision NOW.
-Analyze the conversation and determine if this person is a POTENTIAL LEAD or NOT.
-
-Signs of potential lead:
-- Asking questions about the product/service
-- Showing interest or curiosity
-- Wanting to know pricing, features, or details
-- Agreeing to a demo or follow-up call
-- Positive or engaged responses
-
-Signs of NOT a lead:
-- Short dismissive responses
-- Clearly not interested
-- Wrong person/industry fit
-- No engagement
-
-Client's message: {user_message}
-
-Respond with a brief closing message, and you MUST end with either [QUALIFIED] or [NOT_QUALIFIED].
-Example: "Thank you for your interest! I'll have our team reach out with more details. [QUALIFIED]"
-Or: "I understand this isn't a priority for you right now. Thank you for your time! [NOT_QUALIFIED]"
-
-Your response:"""
+        parts += [
+            f"\nCRITICAL: This is message {user_message_count}. You MUST make a final decision NOW.\n",
+            _DECISION_CRITERIA,
+            f"Client's message: {user_message}",
+            _DECISION_CLOSING
+        ]
     else:
-        conversation_context += f"""
-Instructions:
-1. Ask ONE quick qualifying question
-2. Keep it to 1-2 sentences max
-3. Try to gauge their interest level quickly
-4. We need to qualify them within 3-4 total messages
-
-Client's response: {user_message}
-
-Your response:"""
+        parts += [
+            _QUALIFYING_INSTRUCTIONS,
+            f"Client's response: {user_message}",
+            "\n\nYour response:"
+        ]
+    
+    conversation_context = "".join(parts)
     
     # Get AI response
     try:
@@ -276,73 +306,51 @@ Your response:"""
     except Exception as e:
         return {"success": False, "message": f"Error calling AI: {str(e)}"}
     
-    # Check for qualification tags
+    # Check for qualification tags (old POTENTIAL_* tags kept for compatibility)
     is_potential = False
     conversation_ended = False
     alert_message = None
     
-    if "[QUALIFIED]" in ai_response:
-        is_potential = True
+    found_tags = set(_DECISION_TAG_RE.findall(ai_response))
+    tag = next((t for t in _DECISION_TAGS if t in found_tags), None)
+    if tag:
+        is_potential = tag in _QUALIFIED_TAGS
         conversation_ended = True
-        ai_response = ai_response.replace("[QUALIFIED]", "").strip()
-        alert_message = "🎯 ADDED TO POTENTIAL LEADS DATABASE!"
-        
-        # Add to potential leads
-        leads_state["potential_leads"].append({
-            **lead,
-            "summary": user_message
-        })
-        
-        # Update lead in DB
+        ai_response = _DECISION_TAG_RE.sub("", ai_response).strip()
         leads_collection = database.get_collection("leads")
-        await leads_collection.update_one(
-            {"lead_id": lead_id},
-            {
-                "$set": {
-                    "status": "potential",
-                    "is_potential": True,
-                    "conversation_summary": user_message,
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
         
-    elif "[NOT_QUALIFIED]" in ai_response:
-        conversation_ended = True
-        ai_response = ai_response.replace("[NOT_QUALIFIED]", "").strip()
-        alert_message = "Lead not qualified - moving to next"
-        
-        # Update lead in DB
-        leads_collection = database.get_collection("leads")
-        await leads_collection.update_one(
-            {"lead_id": lead_id},
-            {"$set": {"status": "not_interested", "updated_at": datetime.utcnow()}}
-        )
-    
-    # Also check old tags for compatibility
-    elif "[POTENTIAL_YES]" in ai_response:
-        is_potential = True
-        conversation_ended = True
-        ai_response = ai_response.replace("[POTENTIAL_YES]", "").strip()
-        alert_message = "🎯 ADDED TO POTENTIAL LEADS DATABASE!"
-        leads_state["potential_leads"].append({**lead, "summary": user_message})
-        leads_collection = database.get_collection("leads")
-        await leads_collection.update_one(
-            {"lead_id": lead_id},
-            {"$set": {"status": "potential", "is_potential": True, "updated_at": datetime.utcnow()}}
-        )
-    elif "[POTENTIAL_NO]" in ai_response:
-        conversation_ended = True
-        ai_response = ai_response.replace("[POTENTIAL_NO]", "").strip()
-        alert_message = "Lead not qualified - moving to next"
-        leads_collection = database.get_collection("leads")
-        await leads_collection.update_one(
-            {"lead_id": lead_id},
-            {"$set": {"status": "not_interested", "updated_at": datetime.utcnow()}}
-        )
+        if is_potential:
+            alert_message = "🎯 ADDED TO POTENTIAL LEADS DATABASE!"
+            
+            # Add to potential leads
+            leads_state["potential_leads"].append({
+                **lead,
+                "summary": user_message
+            })
+            
+            # Update lead in DB
+            await leads_collection.update_one(
+                {"lead_id": lead_id},
+                {
+                    "$set": {
+                        "status": "potential",
+                        "is_potential": True,
+                        "conversation_summary": user_message,
+                        "updated_at": datetime.utcnow()
+                    }
+                }
+            )
+        else:
+            alert_message = "Lead not qualified - moving to next"
+            
+            # Update lead in DB
+            await leads_collection.update_one(
+                {"lead_id": lead_id},
+                {"$set": {"status": "not_interested", "updated_at": datetime.utcnow()}}
+            )
     
     # Add AI response to history
-    leads_state["conversation_history"][lead_id].append({
+    history.append({
         "role": "agent",
         "content": ai_response
     })
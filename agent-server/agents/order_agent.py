@@ -6,9 +6,13 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from agents.state import AgentState
 from agents.router import get_llm
+from agents.conversations import invalidate_conversation_history
 from database.connection import database
 from database.models import OrderStatus, SupplierQueryStatus
+from database.queries import stock_change_update
+from cache import invalidate
 from datetime import datetime, timedelta
+from pymongo import UpdateOne
 import uuid
 
 
@@ -296,12 +300,16 @@ async def place_order(state: AgentState) -> str:
         result = await orders_collection.insert_one(order_doc)
         order_id = str(result.inserted_id)
         
-        # Update inventory for available stock
-        for product_id, qty in inventory_updates:
-            await products_collection.update_one(
-                {"_id": product_id},
-                {"$inc": {"quantity": -qty}}
+        # Update inventory for available stock in one bulk write
+        if inventory_updates:
+            await products_collection.bulk_write(
+                [
+                    UpdateOne({"_id": product_id}, stock_change_update(-qty))
+                    for product_id, qty in inventory_updates
+                ],
+                ordered=False
             )
+        invalidate("orders", "products")
         
         # If stock issues, query suppliers
         if stock_issues:
@@ -445,6 +453,7 @@ Please reply with your availability. Thank you!"""
                         "$set": {"updated_at": datetime.utcnow()}
                     }
                 )
+                invalidate_conversation_history(existing_conv.get("conversation_id"))
                 supplier_conversation_id = str(existing_conv["_id"])
             else:
                 # Create new conversation with supplier
@@ -6,10 +6,14 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from agents.state import AgentState
 from agents.router import get_llm
+from agents.conversations import invalidate_conversation_history
 from database.connection import database
 from database.models import BottleneckType, BottleneckSeverity
+from database.queries import stock_change_update
+from cache import invalidate
 from datetime import datetime, timedelta
 from bson import ObjectId
+import asyncio
 
 
 SUPPLIER_SYSTEM_PROMPT = """You are a procurement agent for an MSME jewelry business called "Bhangale Jewellers".
@@ -37,6 +41,59 @@ When supplier confirms availability:
 Your business address for deliveries: Bhangale Jewellers, 123 Main Market, Mumbai - 400001"""
 
 
+# Notification templates, formatted per supplier/customer
+_UPDATE_MSG_TMPL = """📢 **Update on Stock Requirement**
+
+{fulfilled_by} has provided partial stock. Our updated requirement is:
+
+📦 **Product:** {product_name}
+📊 **New Quantity Needed:** {new_requirement} units (reduced from {previous_requirement})
+🆔 **Order Reference:** {order_number}
+
+If you can supply any of this quantity, please let us know your availability, price, and delivery timeline."""
+
+_CANCEL_MSG_TMPL = """📢 **Stock Requirement Fulfilled**
+
+Thank you for your response! We wanted to let you know that our requirement for **{product_name}** has been fulfilled by another supplier ({fulfilled_by}).
+
+We appreciate your time and will reach out again for future requirements. Thank you for being our partner! 🙏"""
+
+_CUSTOMER_MSG_TMPL = """🎉 **Great News About Your Order!**
+
+Hi! We wanted to update you on your order **{order_number}**.
+
+✅ We've secured all the products for your order from our suppliers!
+
+📦 **Estimated Delivery:** {delivery_days} days from now
+
+Your order is now being processed and will be shipped soon. Thank you for your patience!
+
+If you have any questions, feel free to ask. 😊"""
+
+_UNFULFILLABLE_MSG_TMPL = """😔 **Important Update About Your Order**
+
+Hi! We need to inform you about your order **{order_number}**.
+
+Unfortunately, we were unable to source **{quantity_needed} units of {product_name}** from our suppliers at this time.
+
+❌ **Status:** Order cannot be fulfilled currently
+
+**What happens next:**
+- Your order has been marked as unfulfillable
+- No payment will be processed
+- We'll notify you when this product becomes available again
+
+We sincerely apologize for the inconvenience. Would you like us to:
+1. Notify you when this product is back in stock?
+2. Suggest alternative products?
+3. Help you with something else?
+
+Please let us know how we can assist you. 🙏"""
+
+# Max supplier notifications in flight at once
+_NOTIFY_CONCURRENCY = 16
+
+
 async def supplier_agent(state: AgentState) -> AgentState:
     """
     Handle supplier communications.
@@ -115,6 +172,7 @@ async def query_suppliers_for_product(state: AgentState) -> AgentState:
     queries_collection = database.get_collection("supplier_queries")
     
     messages_to_send = []
+    now = datetime.utcnow()
     
     for query in pending_queries:
         product_name = query.get("product")
@@ -131,7 +189,7 @@ async def query_suppliers_for_product(state: AgentState) -> AgentState:
                 "product_name": product_name,
                 "quantity_needed": quantity_needed,
                 "status": "pending",
-                "created_at": datetime.utcnow(),
+                "created_at": now,
                 "conversation_id": state.get("conversation_id")
             }
             
@@ -156,15 +214,40 @@ async def query_suppliers_for_product(state: AgentState) -> AgentState:
 
 async def get_supplier_info(supplier_id: str) -> dict:
     """Get supplier information by ID."""
-    if not supplier_id:
+    if not supplier_id or not ObjectId.is_valid(supplier_id):
         return {}
     
-    try:
-        suppliers_collection = database.get_collection("suppliers")
-        supplier = await suppliers_collection.find_one({"_id": ObjectId(supplier_id)})
-        return supplier or {}
-    except Exception:
+    suppliers_collection = database.get_collection("suppliers")
+    supplier = await suppliers_collection.find_one({"_id": ObjectId(supplier_id)})
+    return supplier or {}
+
+
+async def _gather_bounded(notify_one, queries: list):
+    """Run notify_one for every query concurrently, bounded by _NOTIFY_CONCURRENCY."""
+    semaphore = asyncio.Semaphore(_NOTIFY_CONCURRENCY)
+    
+    async def guarded(q):
+        async with semaphore:
+            await notify_one(q)
+    
+    await asyncio.gather(*(guarded(q) for q in queries))
+
+
+async def _get_supplier_conversation_ids(conversations_collection, queries: list) -> dict:
+    """Map supplier_id -> active supplier conversation (_id, conversation_id) for all queries in one lookup."""
+    supplier_ids = [q.get("supplier_id") for q in queries]
+    if not supplier_ids:
         return {}
+    
+    convs = await conversations_collection.find(
+        {"type": "supplier", "supplier_id": {"$in": supplier_ids}, "is_active": True},
+        projection={"_id": 1, "supplier_id": 1, "conversation_id": 1}
+    ).to_list(None)
+    
+    conv_by_sid = {}
+    for c in convs:
+        conv_by_sid.setdefault(c["supplier_id"], c)
+    return conv_by_sid
 
 
 async def get_pending_queries_for_supplier(supplier_id: str) -> list:
@@ -179,18 +262,6 @@ async def get_pending_queries_for_supplier(supplier_id: str) -> list:
     return queries
 
 
-def format_pending_queries(queries: list) -> str:
-    """Format pending queries for LLM context."""
-    if not queries:
-        return "No pending inquiries."
-    
-    lines = []
-    for q in queries:
-        lines.append(f"- {q.get('product_name')}: Need {q.get('quantity_needed')} units")
-    
-    return "\n".join(lines)
-
-
 async def process_supplier_response(state: AgentState, response: str):
     """Process supplier response, update inventory, propagate to other suppliers, notify customer."""
     supplier_id = state.get("supplier_id")
@@ -205,6 +276,9 @@ async def process_supplier_response(state: AgentState, response: str):
     activities_collection = database.get_collection("agent_activities")
     conversations_collection = database.get_collection("conversations")
     
+    # Single timestamp for every write caused by this response
+    now = datetime.utcnow()
+    
     # Get the last message from user (supplier's response)
     messages = state.get("messages", [])
     supplier_message = ""
@@ -216,6 +290,14 @@ async def process_supplier_response(state: AgentState, response: str):
     if not supplier_message:
         return
     
+    # Nothing to update if this supplier has no open queries - skip the extraction call
+    pending_count = await queries_collection.count_documents(
+        {"supplier_id": supplier_id, "status": "pending"},
+        limit=1
+    )
+    if pending_count == 0:
+        return
+    
     # Use LLM to extract availability info from supplier message
     llm = get_llm()
     extraction_prompt = f"""Extract stock availability information from this supplier response.
@@ -274,7 +356,7 @@ Only respond with the JSON, no other text."""
                 "$set": {
                     "status": "unavailable",
                     "response_message": supplier_message,
-                    "responded_at": datetime.utcnow()
+                    "responded_at": now
                 }
             }
         )
@@ -314,7 +396,8 @@ Only respond with the JSON, no other text."""
                     product_name=product_name,
                     quantity_needed=quantity_needed,
                     conversations_collection=conversations_collection,
-                    orders_collection=orders_collection
+                    orders_collection=orders_collection,
+                    now=now
                 )
         
         return
@@ -347,7 +430,7 @@ Only respond with the JSON, no other text."""
                     "response_quantity": actual_provided,
                     "price_per_unit": price,
                     "delivery_days": delivery_days,
-                    "responded_at": datetime.utcnow()
+                    "responded_at": now
                 }
             }
         )
@@ -355,8 +438,9 @@ Only respond with the JSON, no other text."""
         # Update inventory with the stock provided
         await products_collection.update_one(
             {"_id": ObjectId(product_id)},
-            {"$inc": {"quantity": actual_provided}}
+            stock_change_update(actual_provided)
         )
+        invalidate("products")
         
         print(f"✅ Stock added: {product_name} +{actual_provided} units from {query.get('supplier_name')}")
         
@@ -367,7 +451,7 @@ Only respond with the JSON, no other text."""
             "details": f"+{actual_provided} units of {product_name} from {query.get('supplier_name')} at ₹{price}/unit",
             "order_id": order_id,
             "conversation_id": customer_conversation_id,
-            "timestamp": datetime.utcnow(),
+            "timestamp": now,
             "success": True
         })
         
@@ -382,7 +466,8 @@ Only respond with the JSON, no other text."""
                 new_requirement=remaining_after_this,
                 fulfilled_by=query.get("supplier_name"),
                 queries_collection=queries_collection,
-                conversations_collection=conversations_collection
+                conversations_collection=conversations_collection,
+                now=now
             )
         else:
             # Requirement fully met - cancel other pending queries for this product/order
@@ -397,7 +482,7 @@ Only respond with the JSON, no other text."""
                     "$set": {
                         "status": "cancelled",
                         "cancelled_reason": f"Requirement fulfilled by {query.get('supplier_name')}",
-                        "cancelled_at": datetime.utcnow()
+                        "cancelled_at": now
                     }
                 }
             )
@@ -409,7 +494,8 @@ Only respond with the JSON, no other text."""
                 product_name=product_name,
                 fulfilled_by=query.get("supplier_name"),
                 supplier_id_to_skip=supplier_id,
-                conversations_collection=conversations_collection
+                conversations_collection=conversations_collection,
+                now=now
             )
         
         # Check if ALL products for the order are now fulfilled
@@ -420,7 +506,7 @@ Only respond with the JSON, no other text."""
         
         if still_pending == 0:
             # All stock requirements met - update order and notify customer
-            delivery_estimate = datetime.utcnow() + timedelta(days=delivery_days or 5)
+            delivery_estimate = now + timedelta(days=delivery_days or 5)
             
             await orders_collection.update_one(
                 {"_id": ObjectId(order_id)},
@@ -429,17 +515,19 @@ Only respond with the JSON, no other text."""
                         "status": "pending",
                         "awaiting_supplier": False,
                         "estimated_delivery": delivery_estimate,
-                        "updated_at": datetime.utcnow()
+                        "updated_at": now
                     }
                 }
             )
+            invalidate("orders")
             
             # Notify the customer
             await notify_customer_stock_available(
                 customer_conversation_id=customer_conversation_id,
                 order_number=order_number,
                 delivery_days=delivery_days or 5,
-                conversations_collection=conversations_collection
+                conversations_collection=conversations_collection,
+                now=now
             )
             
             print(f"🎉 Order {order_number} fully stocked! Customer notified.")
@@ -453,56 +541,57 @@ async def update_other_suppliers_requirement(
     new_requirement: int,
     fulfilled_by: str,
     queries_collection,
-    conversations_collection
+    conversations_collection,
+    now: datetime | None = None
 ):
     """Update other pending suppliers about reduced requirement."""
+    now = now or datetime.utcnow()
     other_queries = await queries_collection.find({
         "order_id": order_id,
         "product_id": product_id,
         "status": "pending"
     }).to_list(50)
-    
-    for q in other_queries:
-        # Update the requirement in the query
-        await queries_collection.update_one(
-            {"_id": q["_id"]},
-            {"$set": {"quantity_needed": new_requirement}}
-        )
-        
-        # Send updated message to supplier conversation
-        update_message = f"""📢 **Update on Stock Requirement**
 
-{fulfilled_by} has provided partial stock. Our updated requirement is:
-
-📦 **Product:** {product_name}
-📊 **New Quantity Needed:** {new_requirement} units (reduced from {q.get('quantity_needed')})
-🆔 **Order Reference:** {order_number}
+    # Update the requirement on all pending queries in a single round-trip
+    await queries_collection.update_many(
+        {"order_id": order_id, "product_id": product_id, "status": "pending"},
+        {"$set": {"quantity_needed": new_requirement}}
+    )
+    
+    conv_by_sid = await _get_supplier_conversation_ids(conversations_collection, other_queries)
 
-If you can supply any of this quantity, please let us know your availability, price, and delivery timeline."""
+    async def _notify_one(q):
+        # Send updated message to supplier conversation
+        update_message = _UPDATE_MSG_TMPL.format(
+            fulfilled_by=fulfilled_by,
+            product_name=product_name,
+            new_requirement=new_requirement,
+            previous_requirement=q.get("quantity_needed"),
+            order_number=order_number
+        )
 
-        # Find and update supplier conversation
-        supplier_conv = await conversations_collection.find_one({
-            "type": "supplier",
-            "supplier_id": q.get("supplier_id"),
-            "is_active": True
-        })
+        # Update supplier conversation
+        conv = conv_by_sid.get(q.get("supplier_id"))
         
-        if supplier_conv:
+        if conv:
             await conversations_collection.update_one(
-                {"_id": supplier_conv["_id"]},
+                {"_id": conv["_id"]},
                 {
                     "$push": {
                         "messages": {
                             "role": "assistant",
                             "content": update_message,
-                            "timestamp": datetime.utcnow(),
+                            "timestamp": now,
                             "metadata": {"type": "requirement_update", "order_number": order_number}
                         }
                     },
-                    "$set": {"updated_at": datetime.utcnow()}
+                    "$set": {"updated_at": now}
                 }
             )
             print(f"📤 Updated {q.get('supplier_name')}: now need {new_requirement} units of {product_name}")
+    
+    await _gather_bounded(_notify_one, other_queries)
+    invalidate_conversation_history(*(c.get("conversation_id") for c in conv_by_sid.values()))
 
 
 async def notify_suppliers_requirement_fulfilled(
@@ -511,9 +600,11 @@ async def notify_suppliers_requirement_fulfilled(
     product_name: str,
     fulfilled_by: str,
     supplier_id_to_skip: str,
-    conversations_collection
+    conversations_collection,
+    now: datetime | None = None
 ):
     """Notify other suppliers that we no longer need this product."""
+    now = now or datetime.utcnow()
     queries_collection = database.get_collection("supplier_queries")
     
     cancelled_queries = await queries_collection.find({
@@ -523,54 +614,49 @@ async def notify_suppliers_requirement_fulfilled(
         "status": "cancelled"
     }).to_list(50)
     
-    for q in cancelled_queries:
-        cancel_message = f"""📢 **Stock Requirement Fulfilled**
-
-Thank you for your response! We wanted to let you know that our requirement for **{product_name}** has been fulfilled by another supplier ({fulfilled_by}).
-
-We appreciate your time and will reach out again for future requirements. Thank you for being our partner! 🙏"""
+    cancel_message = _CANCEL_MSG_TMPL.format(
+        product_name=product_name,
+        fulfilled_by=fulfilled_by
+    )
+    
+    conv_by_sid = await _get_supplier_conversation_ids(conversations_collection, cancelled_queries)
 
-        supplier_conv = await conversations_collection.find_one({
-            "type": "supplier",
-            "supplier_id": q.get("supplier_id"),
-            "is_active": True
-        })
+    async def _notify_one(q):
+        conv = conv_by_sid.get(q.get("supplier_id"))
         
-        if supplier_conv:
+        if conv:
             await conversations_collection.update_one(
-                {"_id": supplier_conv["_id"]},
+                {"_id": conv["_id"]},
                 {
                     "$push": {
                         "messages": {
                             "role": "assistant",
                             "content": cancel_message,
-                            "timestamp": datetime.utcnow(),
+                            "timestamp": now,
                             "metadata": {"type": "requirement_cancelled", "order_id": order_id}
                         }
                     },
-                    "$set": {"updated_at": datetime.utcnow()}
+                    "$set": {"updated_at": now}
                 }
             )
+    
+    await _gather_bounded(_notify_one, cancelled_queries)
+    invalidate_conversation_history(*(c.get("conversation_id") for c in conv_by_sid.values()))
 
 
 async def notify_customer_stock_available(
     customer_conversation_id: str,
     order_number: str,
     delivery_days: int,
-    conversations_collection
+    conversations_collection,
+    now: datetime | None = None
 ):
     """Send message to customer that their order is now ready."""
-    customer_message = f"""🎉 **Great News About Your Order!**
-
-Hi! We wanted to update you on your order **{order_number}**.
-
-✅ We've secured all the products for your order from our suppliers!
-
-📦 **Estimated Delivery:** {delivery_days} days from now
-
-Your order is now being processed and will be shipped soon. Thank you for your patience!
-
-If you have any questions, feel free to ask. 😊"""
+    now = now or datetime.utcnow()
+    customer_message = _CUSTOMER_MSG_TMPL.format(
+        order_number=order_number,
+        delivery_days=delivery_days
+    )
 
     # Find and update customer conversation
     customer_conv = await conversations_collection.find_one({
@@ -585,13 +671,14 @@ If you have any questions, feel free to ask. 😊"""
                     "messages": {
                         "role": "assistant",
                         "content": customer_message,
-                        "timestamp": datetime.utcnow(),
+                        "timestamp": now,
                         "metadata": {"type": "stock_update", "order_number": order_number}
                     }
                 },
-                "$set": {"updated_at": datetime.utcnow()}
+                "$set": {"updated_at": now}
             }
         )
+        invalidate_conversation_history(customer_conversation_id)
         print(f"📧 Customer notified about order {order_number} being ready!")
 
 
@@ -601,28 +688,16 @@ async def notify_customer_order_unfulfillable(
     product_name: str,
     quantity_needed: int,
     conversations_collection,
-    orders_collection
+    orders_collection,
+    now: datetime | None = None
 ):
     """Send message to customer that their order cannot be fulfilled due to no supplier availability."""
-    customer_message = f"""😔 **Important Update About Your Order**
-
-Hi! We need to inform you about your order **{order_number}**.
-
-Unfortunately, we were unable to source **{quantity_needed} units of {product_name}** from our suppliers at this time.
-
-❌ **Status:** Order cannot be fulfilled currently
-
-**What happens next:**
-- Your order has been marked as unfulfillable
-- No payment will be processed
-- We'll notify you when this product becomes available again
-
-We sincerely apologize for the inconvenience. Would you like us to:
-1. Notify you when this product is back in stock?
-2. Suggest alternative products?
-3. Help you with something else?
-
-Please let us know how we can assist you. 🙏"""
+    now = now or datetime.utcnow()
+    customer_message = _UNFULFILLABLE_MSG_TMPL.format(
+        order_number=order_number,
+        product_name=product_name,
+        quantity_needed=quantity_needed
+    )
 
     # Find and update customer conversation
     customer_conv = await conversations_collection.find_one({
@@ -637,13 +712,14 @@ Please let us know how we can assist you. 🙏"""
                     "messages": {
                         "role": "assistant",
                         "content": customer_message,
-                        "timestamp": datetime.utcnow(),
+                        "timestamp": now,
                         "metadata": {"type": "order_unfulfillable", "order_number": order_number}
                     }
                 },
-                "$set": {"updated_at": datetime.utcnow()}
+                "$set": {"updated_at": now}
             }
         )
+        invalidate_conversation_history(customer_conversation_id)
     
     # Update order status to cancelled/unfulfillable
     from bson import ObjectId
@@ -656,10 +732,11 @@ Please let us know how we can assist you. 🙏"""
                 "$set": {
                     "status": "cancelled",
                     "cancellation_reason": f"Unable to source {product_name} from suppliers",
-                    "updated_at": datetime.utcnow()
+                    "updated_at": now
                 }
             }
         )
+        invalidate("orders")
     
     print(f"📧 Customer notified: Order {order_number} cannot be fulfilled")
 
@@ -686,6 +763,7 @@ async def create_supplier_delay_bottleneck(queries: list):
     }
     
     await bottlenecks_collection.insert_one(bottleneck)
+    invalidate("bottlenecks")
 
 
 async def get_all_suppliers() -> list:
@@ -6,10 +6,59 @@ from langchain_core.messages import AIMessage
 from agents.state import AgentState
 from database.connection import database
 from database.models import TaskStatus, BottleneckType, BottleneckSeverity
+from database.queries import workload_change_update
+from cache import async_ttl_cache, invalidate
 from datetime import datetime
+from pymongo import UpdateOne
+from bson import ObjectId
 import uuid
 
 
+# Staff totals computed server-side (missing fields fall back to model defaults)
+_STAFF_TOTALS_GROUP = {
+    "$group": {
+        "_id": None,
+        "total_capacity": {"$sum": {"$ifNull": ["$max_workload", 10]}},
+        "total_current": {"$sum": {"$ifNull": ["$current_workload", 0]}},
+        "max_workload": {"$max": {"$ifNull": ["$current_workload", 0]}},
+        "min_workload": {"$min": {"$ifNull": ["$current_workload", 0]}}
+    }
+}
+
+# Available staff more than 2 tasks off the team average, with up to two of
+# the oldest pending tasks attached to each overloaded member
+_IMBALANCED_STAFF_PIPELINE = [
+    {"$match": {"is_available": True}},
+    {"$set": {"current_workload": {"$ifNull": ["$current_workload", 0]}}},
+    {"$setWindowFields": {
+        "output": {
+            "avg": {
+                "$avg": "$current_workload",
+                "window": {"documents": ["unbounded", "unbounded"]}
+            }
+        }
+    }},
+    {"$set": {"delta": {"$subtract": ["$current_workload", "$avg"]}}},
+    {"$match": {"$expr": {"$or": [{"$gt": ["$delta", 2]}, {"$lt": ["$delta", -2]}]}}},
+    {"$lookup": {
+        "from": "tasks",
+        "let": {"staff_id": "$_id", "delta": "$delta"},
+        "pipeline": [
+            {"$match": {"$expr": {"$and": [
+                {"$gt": ["$$delta", 0]},
+                {"$eq": ["$staff_id", "$$staff_id"]},
+                {"$eq": ["$status", TaskStatus.PENDING.value]}
+            ]}}},
+            {"$sort": {"assigned_at": 1}},
+            {"$limit": 2},
+            {"$project": {"_id": 1}}
+        ],
+        "as": "pending_tasks"
+    }},
+    {"$project": {"current_workload": 1, "avg": 1, "delta": 1, "pending_tasks": 1}}
+]
+
+
 async def workload_agent(state: AgentState) -> AgentState:
     """
     Handle workload distribution and task assignment.
@@ -38,11 +87,12 @@ async def assign_task_to_staff(state: AgentState) -> str:
     priority = context.get("priority", 1)
     
     staff_collection = database.get_collection("staff")
+    tasks_collection = database.get_collection("tasks")
     
     # Find available staff member with lowest workload
     available_staff = await staff_collection.find({
         "is_available": True,
-        "$expr": {"$lt": ["$current_workload", "$max_workload"]}
+        "has_capacity": True
     }).sort("current_workload", 1).to_list(10)
     
     if not available_staff:
@@ -56,6 +106,7 @@ async def assign_task_to_staff(state: AgentState) -> str:
     
     task = {
         "task_id": task_id,
+        "staff_id": selected_staff["_id"],
         "description": task_description,
         "order_id": order_id,
         "status": TaskStatus.PENDING.value,
@@ -63,13 +114,12 @@ async def assign_task_to_staff(state: AgentState) -> str:
         "assigned_at": datetime.utcnow()
     }
     
+    await tasks_collection.insert_one(task)
     await staff_collection.update_one(
         {"_id": selected_staff["_id"]},
-        {
-            "$push": {"assigned_tasks": task},
-            "$inc": {"current_workload": 1}
-        }
+        workload_change_update(1)
     )
+    invalidate("staff")
     
     return f"Task {task_id} assigned to {selected_staff.get('name')} ({selected_staff.get('role')})"
 
@@ -78,13 +128,24 @@ async def analyze_workload() -> str:
     """Analyze current workload distribution."""
     staff_collection = database.get_collection("staff")
     
-    staff_members = await staff_collection.find().to_list(100)
+    result = await staff_collection.aggregate([
+        {"$facet": {
+            "totals": [_STAFF_TOTALS_GROUP],
+            "rows": [
+                {"$limit": 100},
+                {"$project": {"name": 1, "current_workload": 1, "max_workload": 1}}
+            ]
+        }}
+    ]).to_list(1)
+    
+    staff_members = result[0]["rows"] if result else []
     
     if not staff_members:
         return "No staff members found."
     
-    total_capacity = sum(s.get("max_workload", 10) for s in staff_members)
-    total_current = sum(s.get("current_workload", 0) for s in staff_members)
+    totals = result[0]["totals"][0]
+    total_capacity = totals["total_capacity"]
+    total_current = totals["total_current"]
     
     utilization = (total_current / total_capacity * 100) if total_capacity > 0 else 0
     
@@ -110,50 +171,47 @@ async def analyze_workload() -> str:
 async def rebalance_workload() -> str:
     """Rebalance tasks across staff members."""
     staff_collection = database.get_collection("staff")
+    tasks_collection = database.get_collection("tasks")
     
-    staff_members = await staff_collection.find({"is_available": True}).to_list(100)
+    # Average and imbalance detection run server-side
+    imbalanced = await staff_collection.aggregate(_IMBALANCED_STAFF_PIPELINE).to_list(None)
     
-    if len(staff_members) < 2:
+    if not imbalanced and await staff_collection.count_documents({"is_available": True}, limit=2) < 2:
         return "Not enough staff to rebalance."
     
-    # Find overloaded and underloaded staff
-    avg_workload = sum(s.get("current_workload", 0) for s in staff_members) / len(staff_members)
-    
-    overloaded = [s for s in staff_members if s.get("current_workload", 0) > avg_workload + 2]
-    underloaded = [s for s in staff_members if s.get("current_workload", 0) < avg_workload - 2]
+    overloaded = [s for s in imbalanced if s["delta"] > 0]
+    underloaded = [s for s in imbalanced if s["delta"] < 0]
     
     if not overloaded or not underloaded:
         return "Workload is already balanced."
     
+    avg_workload = overloaded[0]["avg"]
     tasks_moved = 0
+    task_moves = []
+    workload_moves = []
     
     for over_staff in overloaded:
-        pending_tasks = [t for t in over_staff.get("assigned_tasks", []) 
-                        if t.get("status") == TaskStatus.PENDING.value]
-        
-        for task in pending_tasks[:2]:  # Move up to 2 tasks
+        for task in over_staff["pending_tasks"]:  # Up to 2 tasks
             if not underloaded:
                 break
             
             under_staff = underloaded[0]
             
-            # Remove from overloaded
-            await staff_collection.update_one(
-                {"_id": over_staff["_id"]},
-                {
-                    "$pull": {"assigned_tasks": {"task_id": task["task_id"]}},
-                    "$inc": {"current_workload": -1}
-                }
-            )
+            # Reassign the task document
+            task_moves.append(UpdateOne(
+                {"_id": task["_id"]},
+                {"$set": {"staff_id": under_staff["_id"]}}
+            ))
             
-            # Add to underloaded
-            await staff_collection.update_one(
+            # Shift workload counters
+            workload_moves.append(UpdateOne(
+                {"_id": over_staff["_id"]},
+                workload_change_update(-1)
+            ))
+            workload_moves.append(UpdateOne(
                 {"_id": under_staff["_id"]},
-                {
-                    "$push": {"assigned_tasks": task},
-                    "$inc": {"current_workload": 1}
-                }
-            )
+                workload_change_update(1)
+            ))
             
             tasks_moved += 1
             
@@ -162,6 +220,12 @@ async def rebalance_workload() -> str:
             if under_staff["current_workload"] >= avg_workload:
                 underloaded.remove(under_staff)
     
+    # Apply all moves with one bulk write per collection
+    if task_moves:
+        await tasks_collection.bulk_write(task_moves, ordered=False)
+        await staff_collection.bulk_write(workload_moves, ordered=False)
+        invalidate("staff")
+    
     return f"Workload rebalanced. {tasks_moved} tasks redistributed."
 
 
@@ -170,17 +234,17 @@ async def check_workload_bottleneck():
     staff_collection = database.get_collection("staff")
     bottlenecks_collection = database.get_collection("bottlenecks")
     
-    staff_members = await staff_collection.find().to_list(100)
+    totals = await staff_collection.aggregate([_STAFF_TOTALS_GROUP]).to_list(1)
+    totals = totals[0] if totals else {}
     
     # Check for general overload
-    total_capacity = sum(s.get("max_workload", 10) for s in staff_members)
-    total_current = sum(s.get("current_workload", 0) for s in staff_members)
+    total_capacity = totals.get("total_capacity", 0)
+    total_current = totals.get("total_current", 0)
     utilization = (total_current / total_capacity * 100) if total_capacity > 0 else 0
     
     # Check for imbalance
-    workloads = [s.get("current_workload", 0) for s in staff_members]
-    max_wl = max(workloads) if workloads else 0
-    min_wl = min(workloads) if workloads else 0
+    max_wl = totals.get("max_workload", 0)
+    min_wl = totals.get("min_workload", 0)
     
     if utilization > 90 or (max_wl - min_wl > 5):
         existing = await bottlenecks_collection.find_one({
@@ -191,8 +255,14 @@ async def check_workload_bottleneck():
         if not existing:
             severity = BottleneckSeverity.HIGH if utilization > 95 else BottleneckSeverity.MEDIUM
             
-            overloaded_names = [s.get("name") for s in staff_members 
-                               if s.get("current_workload", 0) >= s.get("max_workload", 10) - 1]
+            overloaded = await staff_collection.find(
+                {"$expr": {"$gte": [
+                    {"$ifNull": ["$current_workload", 0]},
+                    {"$subtract": [{"$ifNull": ["$max_workload", 10]}, 1]}
+                ]}},
+                {"name": 1}
+            ).to_list(100)
+            overloaded_names = [s.get("name") for s in overloaded]
             
             bottleneck = {
                 "type": BottleneckType.WORKLOAD_IMBALANCE.value,
@@ -210,47 +280,65 @@ async def check_workload_bottleneck():
             }
             
             await bottlenecks_collection.insert_one(bottleneck)
+            invalidate("bottlenecks")
 
 
 async def complete_task(staff_id: str, task_id: str) -> str:
     """Mark a task as completed."""
+    if not ObjectId.is_valid(staff_id):
+        return f"Task {task_id} not found."
+    
     staff_collection = database.get_collection("staff")
+    tasks_collection = database.get_collection("tasks")
     
-    result = await staff_collection.update_one(
-        {"_id": staff_id, "assigned_tasks.task_id": task_id},
+    result = await tasks_collection.update_one(
+        {
+            "task_id": task_id,
+            "staff_id": ObjectId(staff_id),
+            "status": {"$ne": TaskStatus.COMPLETED.value}
+        },
         {
             "$set": {
-                "assigned_tasks.$.status": TaskStatus.COMPLETED.value,
-                "assigned_tasks.$.completed_at": datetime.utcnow()
-            },
-            "$inc": {"current_workload": -1}
+                "status": TaskStatus.COMPLETED.value,
+                "completed_at": datetime.utcnow()
+            }
         }
     )
     
     if result.modified_count > 0:
+        await staff_collection.update_one(
+            {"_id": ObjectId(staff_id)},
+            workload_change_update(-1)
+        )
+        invalidate("staff")
         return f"Task {task_id} marked as completed."
     return f"Task {task_id} not found."
 
 
+@async_ttl_cache(ttl=5, reads=("staff",))
 async def get_workload_distribution() -> list:
     """Get workload distribution for all staff."""
     staff_collection = database.get_collection("staff")
     
-    staff_members = await staff_collection.find().to_list(100)
-    
-    distribution = []
-    for staff in staff_members:
-        current = staff.get("current_workload", 0)
-        max_wl = staff.get("max_workload", 10)
-        utilization = (current / max_wl * 100) if max_wl > 0 else 0
-        
-        distribution.append({
-            "staff_id": str(staff["_id"]),
-            "staff_name": staff.get("name"),
-            "role": staff.get("role"),
-            "current_tasks": current,
-            "max_capacity": max_wl,
-            "utilization_percent": round(utilization, 1)
-        })
-    
-    return distribution
+    # Utilization is computed server-side; documents come back ready to serve
+    return await staff_collection.aggregate([
+        {"$limit": 100},
+        {"$project": {
+            "_id": 0,
+            "staff_id": {"$toString": "$_id"},
+            "staff_name": "$name",
+            "role": 1,
+            "current_tasks": {"$ifNull": ["$current_workload", 0]},
+            "max_capacity": {"$ifNull": ["$max_workload", 10]}
+        }},
+        {"$set": {
+            "utilization_percent": {"$round": [
+                {"$cond": [
+                    {"$gt": ["$max_capacity", 0]},
+                    {"$multiply": [{"$divide": ["$current_tasks", "$max_capacity"]}, 100]},
+                    0
+                ]},
+                1
+            ]}
+        }}
+    ]).to_list(100)
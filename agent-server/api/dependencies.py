@@ -0,0 +1,50 @@
+"""
+Shared FastAPI dependencies for API routes.
+"""
+
+import re
+from bson import ObjectId
+from fastapi import HTTPException
+
+# 24 hex chars - checked up front so malformed IDs never reach ObjectId()
+_OID_RE = re.compile(r"^[0-9a-fA-F]{24}$")
+
+
+def is_object_id(value: str) -> bool:
+    """Check whether a string is a valid ObjectId."""
+    return _OID_RE.match(value) is not None
+
+
+def parse_object_id(value: str, detail: str = "Invalid ID") -> ObjectId:
+    """Convert a string to ObjectId, raising 400 if it is malformed."""
+    if not _OID_RE.match(value):
+        raise HTTPException(status_code=400, detail=detail)
+    return ObjectId(value)
+
+
+def check_update_fields(updates: dict) -> None:
+    """
+    Reject update keys that aren't field paths, raising 400.
+
+    Dotted keys are nested field paths and set the embedded field, as a plain
+    $set did; `$`-prefixed or empty path segments would otherwise surface as a
+    server error from the update pipeline.
+    """
+    for name in updates:
+        if any(not part or part.startswith("$") for part in name.split(".")):
+            raise HTTPException(status_code=400, detail=f"Invalid field name: {name}")
+
+
+def product_oid(product_id: str) -> ObjectId:
+    """Path dependency resolving `product_id` to an ObjectId."""
+    return parse_object_id(product_id, "Invalid product ID")
+
+
+def staff_oid(staff_id: str) -> ObjectId:
+    """Path dependency resolving `staff_id` to an ObjectId."""
+    return parse_object_id(staff_id, "Invalid staff ID")
+
+
+def supplier_oid(supplier_id: str) -> ObjectId:
+    """Path dependency resolving `supplier_id` to an ObjectId."""
+    return parse_object_id(supplier_id, "Invalid supplier ID")
@@ -0,0 +1,44 @@
+"""
+Response helpers shared by API routes.
+"""
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import ORJSONResponse, StreamingResponse
+
+
+def _orjson_default(obj):
+    """Encode types orjson doesn't know natively."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content) -> bytes:
+    """Serialize content to JSON bytes, encoding ObjectIds as strings."""
+    return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class MongoJSONResponse(ORJSONResponse):
+    """orjson-backed JSON response that also handles Mongo ObjectIds."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+async def _iter_json_array(cursor):
+    """Encode documents from a Motor cursor as a JSON array, one document at a time."""
+    yield b"["
+    separator = b""
+    async for doc in cursor:
+        yield separator + dumps(doc)
+        separator = b","
+    yield b"]"
+
+
+def stream_json_array(cursor, batch_size: int = 50) -> StreamingResponse:
+    """Stream a cursor's documents as a JSON array without materializing the result list."""
+    return StreamingResponse(
+        _iter_json_array(cursor.batch_size(batch_size)),
+        media_type="application/json"
+    )
@@ -5,15 +5,27 @@ Analytics API routes - Dashboard metrics and bottleneck analysis.
 from fastapi import APIRouter
 from database.connection import database
 from database.models import DashboardStats, OrderStatus
+from database.queries import PRODUCT_LIST_PROJECTION
 from agents.bottleneck_agent import get_active_bottlenecks, get_bottleneck_stats, comprehensive_analysis
 from agents.workload_agent import get_workload_distribution
+from cache import async_ttl_cache, invalidate
+from api.dependencies import is_object_id
+from api.responses import stream_json_array
 from datetime import datetime, timedelta
 from bson import ObjectId
+import asyncio
 
 router = APIRouter(prefix="/api/analytics", tags=["Analytics"])
 
 
+def _facet_count(facets: list, name: str) -> int:
+    """Read a {"$count": "n"} facet result, treating an empty facet as zero."""
+    rows = facets[0].get(name) if facets else None
+    return rows[0]["n"] if rows else 0
+
+
 @router.get("/overview", response_model=DashboardStats)
+@async_ttl_cache(ttl=5, reads=("orders", "products", "bottlenecks", "staff"))
 async def get_dashboard_overview():
     """Get dashboard overview statistics."""
     orders_collection = database.get_collection("orders")
@@ -21,54 +33,65 @@ async def get_dashboard_overview():
     bottlenecks_collection = database.get_collection("bottlenecks")
     staff_collection = database.get_collection("staff")
     
-    # Order stats
-    total_orders = await orders_collection.count_documents({})
-    pending_orders = await orders_collection.count_documents({
-        "status": {"$in": [OrderStatus.PENDING.value, OrderStatus.CONFIRMED.value]}
-    })
-    processing_orders = await orders_collection.count_documents({
-        "status": OrderStatus.PROCESSING.value
-    })
-    
-    # Orders today
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    orders_today = await orders_collection.count_documents({
-        "created_at": {"$gte": today_start}
-    })
-    
-    # Product stats
-    total_products = await products_collection.count_documents({})
-    low_stock_count = await products_collection.count_documents({
-        "$expr": {"$lte": ["$quantity", "$low_stock_threshold"]}
-    })
     
-    # Bottleneck stats
-    active_bottlenecks = await bottlenecks_collection.count_documents({
-        "is_resolved": False
-    })
+    # One aggregation per collection, all run concurrently
+    order_facets, product_facets, active_bottlenecks, staff_totals = await asyncio.gather(
+        orders_collection.aggregate([
+            {"$facet": {
+                "total": [{"$count": "n"}],
+                "pending": [
+                    {"$match": {"status": {"$in": [OrderStatus.PENDING.value, OrderStatus.CONFIRMED.value]}}},
+                    {"$count": "n"}
+                ],
+                "processing": [
+                    {"$match": {"status": OrderStatus.PROCESSING.value}},
+                    {"$count": "n"}
+                ],
+                "today": [
+                    {"$match": {"created_at": {"$gte": today_start}}},
+                    {"$count": "n"}
+                ]
+            }}
+        ]).to_list(1),
+        products_collection.aggregate([
+            {"$facet": {
+                "total": [{"$count": "n"}],
+                "low_stock": [{"$match": {"is_low_stock": True}}, {"$count": "n"}]
+            }}
+        ]).to_list(1),
+        bottlenecks_collection.count_documents({"is_resolved": False}),
+        staff_collection.aggregate([
+            {"$group": {
+                "_id": None,
+                "total_capacity": {"$sum": {"$ifNull": ["$max_workload", 10]}},
+                "total_current": {"$sum": {"$ifNull": ["$current_workload", 0]}}
+            }}
+        ]).to_list(1)
+    )
     
     # Staff utilization
-    staff_members = await staff_collection.find().to_list(100)
-    if staff_members:
-        total_capacity = sum(s.get("max_workload", 10) for s in staff_members)
-        total_current = sum(s.get("current_workload", 0) for s in staff_members)
+    if staff_totals:
+        total_capacity = staff_totals[0]["total_capacity"]
+        total_current = staff_totals[0]["total_current"]
         staff_utilization = (total_current / total_capacity * 100) if total_capacity > 0 else 0
     else:
         staff_utilization = 0
     
     return DashboardStats(
-        total_orders=total_orders,
-        pending_orders=pending_orders,
-        processing_orders=processing_orders,
-        total_products=total_products,
-        low_stock_count=low_stock_count,
+        total_orders=_facet_count(order_facets, "total"),
+        pending_orders=_facet_count(order_facets, "pending"),
+        processing_orders=_facet_count(order_facets, "processing"),
+        total_products=_facet_count(product_facets, "total"),
+        low_stock_count=_facet_count(product_facets, "low_stock"),
         active_bottlenecks=active_bottlenecks,
         staff_utilization=round(staff_utilization, 1),
-        orders_today=orders_today
+        orders_today=_facet_count(order_facets, "today")
     )
 
 
 @router.get("/bottlenecks")
+@async_ttl_cache(ttl=5, reads=("bottlenecks",))
 async def get_bottlenecks():
     """Get all active bottlenecks."""
     bottlenecks = await get_active_bottlenecks()
@@ -99,22 +122,24 @@ async def resolve_bottleneck(bottleneck_id: str):
     """Mark a bottleneck as resolved."""
     bottlenecks_collection = database.get_collection("bottlenecks")
     
-    try:
-        result = await bottlenecks_collection.update_one(
-            {"_id": ObjectId(bottleneck_id)},
-            {
-                "$set": {
-                    "is_resolved": True,
-                    "resolved_at": datetime.utcnow()
-                }
-            }
-        )
-    except Exception:
+    if not is_object_id(bottleneck_id):
         return {"error": "Invalid bottleneck ID"}
     
+    result = await bottlenecks_collection.update_one(
+        {"_id": ObjectId(bottleneck_id)},
+        {
+            "$set": {
+                "is_resolved": True,
+                "resolved_at": datetime.utcnow()
+            }
+        }
+    )
+    
     if result.modified_count == 0:
         return {"error": "Bottleneck not found"}
     
+    invalidate("bottlenecks")
+    
     return {"message": "Bottleneck resolved"}
 
 
@@ -147,14 +172,9 @@ async def get_agent_activity(limit: int = 50):
     """Get recent agent activity."""
     activities_collection = database.get_collection("agent_activities")
     
-    activities = await activities_collection.find().sort(
-        "timestamp", -1
-    ).limit(limit).to_list(limit)
-    
-    for activity in activities:
-        activity["_id"] = str(activity["_id"])
+    cursor = activities_collection.find().sort("timestamp", -1).limit(limit)
     
-    return activities
+    return stream_json_array(cursor)
 
 
 @router.get("/orders/trends")
@@ -168,9 +188,7 @@ async def get_order_trends(days: int = 7):
         {"$match": {"created_at": {"$gte": start_date}}},
         {
             "$group": {
-                "_id": {
-                    "$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}
-                },
+                "_id": {"$dateTrunc": {"date": "$created_at", "unit": "day"}},
                 "count": {"$sum": 1},
                 "revenue": {"$sum": "$total_amount"}
             }
@@ -178,9 +196,12 @@ async def get_order_trends(days: int = 7):
         {"$sort": {"_id": 1}}
     ]
     
-    trends = await orders_collection.aggregate(pipeline).to_list(days)
+    trends = await orders_collection.aggregate(pipeline, allowDiskUse=False).to_list(days + 1)
     
-    return [{"date": t["_id"], "orders": t["count"], "revenue": t["revenue"]} for t in trends]
+    return [
+        {"date": t["_id"].strftime("%Y-%m-%d"), "orders": t["count"], "revenue": t["revenue"]}
+        for t in trends
+    ]
 
 
 @router.get("/inventory/alerts")
@@ -188,21 +209,21 @@ async def get_inventory_alerts():
     """Get inventory alerts (low stock, out of stock)."""
     products_collection = database.get_collection("products")
     
-    # Out of stock
-    out_of_stock = await products_collection.find({
-        "quantity": 0
-    }).to_list(50)
+    # Projected fields with _id stringified server-side
+    project = {"$project": {**PRODUCT_LIST_PROJECTION, "_id": {"$toString": "$_id"}}}
     
-    # Low stock
-    low_stock = await products_collection.find({
-        "$expr": {"$lte": ["$quantity", "$low_stock_threshold"]},
-        "quantity": {"$gt": 0}
-    }).to_list(50)
+    # Out-of-stock items are a subset of low stock: scan the low-stock index once and split
+    result = await products_collection.aggregate([
+        {"$match": {"is_low_stock": True}},
+        {"$facet": {
+            "out_of_stock": [{"$match": {"quantity": 0}}, {"$limit": 50}, project],
+            "low_stock": [{"$match": {"quantity": {"$gt": 0}}}, {"$limit": 50}, project]
+        }}
+    ]).to_list(1)
     
-    for p in out_of_stock + low_stock:
-        p["_id"] = str(p["_id"])
+    alerts = result[0] if result else {}
     
     return {
-        "out_of_stock": out_of_stock,
-        "low_stock": low_stock
+        "out_of_stock": alerts.get("out_of_stock", []),
+        "low_stock": alerts.get("low_stock", [])
     }
@@ -3,8 +3,13 @@ Chat API routes - Consumer and Supplier chat endpoints.
 """
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response
 from database.models import ChatRequest, ChatResponse, SupplierChatRequest
-from agents.graph import run_agent, get_conversation_history
+from database.connection import database
+from agents.graph import run_agent
+from agents.conversations import get_conversation_history
+from api.responses import dumps
+from cache import async_lru_cache
 import traceback
 
 router = APIRouter(prefix="/api/chat", tags=["Chat"])
@@ -74,11 +79,9 @@ async def get_chat_history(conversation_id: str):
     return conversation
 
 
-@router.get("/conversations")
-async def list_conversations(limit: int = 20, conversation_type: str = None):
-    """List recent conversations."""
-    from database.connection import database
-    
+@async_lru_cache(maxsize=64, ttl=2)
+async def _recent_conversations_json(limit: int, conversation_type: str | None) -> bytes:
+    """Encoded list of recent conversations, shared by pollers for a short window."""
     conversations_collection = database.get_collection("conversations")
     
     query = {}
@@ -89,8 +92,12 @@ async def list_conversations(limit: int = 20, conversation_type: str = None):
         "updated_at", -1
     ).limit(limit).to_list(limit)
     
-    # Convert ObjectId to string
-    for conv in conversations:
-        conv["_id"] = str(conv["_id"])
+    return dumps(conversations)
+
+
+@router.get("/conversations")
+async def list_conversations(limit: int = 20, conversation_type: str = None):
+    """List recent conversations."""
+    content = await _recent_conversations_json(limit, conversation_type)
     
-    return conversations
+    return Response(content=content, media_type="application/json")
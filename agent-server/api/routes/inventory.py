@@ -2,11 +2,17 @@
 Inventory API routes - Product and inventory management.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from database.connection import database
-from database.models import ProductCreate, ProductCategory
+from database.models import ProductCreate
+from database.queries import (
+    PRODUCT_LIST_PROJECTION, LOW_STOCK_FLAG_STAGE, is_low_stock, stock_change_update
+)
 from datetime import datetime
 from bson import ObjectId
+from cache import async_ttl_cache, invalidate
+from api.dependencies import product_oid, check_update_fields
+from api.responses import stream_json_array
 
 router = APIRouter(prefix="/api/inventory", tags=["Inventory"])
 
@@ -25,51 +31,54 @@ async def list_inventory(
         query["category"] = category
     
     if low_stock_only:
-        query["$expr"] = {"$lte": ["$quantity", "$low_stock_threshold"]}
+        query["is_low_stock"] = True
     
-    products = await products_collection.find(query).sort("category", 1).to_list(limit)
+    cursor = products_collection.find(query, PRODUCT_LIST_PROJECTION).sort("category", 1).limit(limit)
     
-    # Convert ObjectId to string
-    for product in products:
-        product["_id"] = str(product["_id"])
-    
-    return products
+    return stream_json_array(cursor)
 
 
 @router.get("/stats")
+@async_ttl_cache(ttl=5, reads=("products",))
 async def get_inventory_stats():
     """Get inventory statistics."""
     products_collection = database.get_collection("products")
     
-    total = await products_collection.count_documents({})
-    out_of_stock = await products_collection.count_documents({"quantity": 0})
-    low_stock = await products_collection.count_documents({
-        "$expr": {"$lte": ["$quantity", "$low_stock_threshold"]},
-        "quantity": {"$gt": 0}
-    })
+    stock_value = {"$multiply": ["$price", "$quantity"]}
     
-    # By category
+    # Counts, total value and per-category breakdown in one pass
     pipeline = [
-        {"$group": {
-            "_id": "$category",
-            "count": {"$sum": 1},
-            "total_value": {"$sum": {"$multiply": ["$price", "$quantity"]}}
+        {"$facet": {
+            "counts": [
+                {"$group": {
+                    "_id": None,
+                    "total": {"$sum": 1},
+                    "out_of_stock": {"$sum": {"$cond": [{"$eq": ["$quantity", 0]}, 1, 0]}},
+                    "low_stock": {"$sum": {"$cond": [
+                        {"$and": [{"$eq": ["$is_low_stock", True]}, {"$gt": ["$quantity", 0]}]}, 1, 0
+                    ]}},
+                    "total_value": {"$sum": stock_value}
+                }}
+            ],
+            "by_category": [
+                {"$group": {
+                    "_id": "$category",
+                    "count": {"$sum": 1},
+                    "total_value": {"$sum": stock_value}
+                }}
+            ]
         }}
     ]
-    category_stats = await products_collection.aggregate(pipeline).to_list(10)
+    result = await products_collection.aggregate(pipeline).to_list(1)
     
-    # Total inventory value
-    value_pipeline = [
-        {"$group": {"_id": None, "total": {"$sum": {"$multiply": ["$price", "$quantity"]}}}}
-    ]
-    value_result = await products_collection.aggregate(value_pipeline).to_list(1)
-    total_value = value_result[0]["total"] if value_result else 0
+    counts = result[0]["counts"][0] if result and result[0]["counts"] else {}
+    category_stats = result[0]["by_category"] if result else []
     
     return {
-        "total_products": total,
-        "out_of_stock": out_of_stock,
-        "low_stock": low_stock,
-        "total_value": total_value,
+        "total_products": counts.get("total", 0),
+        "out_of_stock": counts.get("out_of_stock", 0),
+        "low_stock": counts.get("low_stock", 0),
+        "total_value": counts.get("total_value", 0),
         "by_category": {stat["_id"]: stat for stat in category_stats}
     }
 
@@ -79,9 +88,10 @@ async def get_low_stock():
     """Get items that are low or out of stock."""
     products_collection = database.get_collection("products")
     
-    products = await products_collection.find({
-        "$expr": {"$lte": ["$quantity", "$low_stock_threshold"]}
-    }).sort("quantity", 1).to_list(50)
+    products = await products_collection.find(
+        {"is_low_stock": True},
+        PRODUCT_LIST_PROJECTION
+    ).sort("quantity", 1).to_list(50)
     
     for product in products:
         product["_id"] = str(product["_id"])
@@ -104,14 +114,11 @@ async def get_categories():
 
 
 @router.get("/{product_id}")
-async def get_product(product_id: str):
+async def get_product(oid: ObjectId = Depends(product_oid)):
     """Get product details."""
     products_collection = database.get_collection("products")
     
-    try:
-        product = await products_collection.find_one({"_id": ObjectId(product_id)})
-    except Exception:
-        product = None
+    product = await products_collection.find_one({"_id": oid})
     
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
@@ -125,60 +132,59 @@ async def add_product(product: ProductCreate):
     """Add a new product."""
     products_collection = database.get_collection("products")
     
-    product_doc = product.model_dump()
-    product_doc["created_at"] = datetime.utcnow()
-    product_doc["updated_at"] = datetime.utcnow()
-    product_doc["category"] = product.category.value
+    # mode="json" emits the category enum's value in the same pass
+    product_doc = product.model_dump(mode="json")
+    now = datetime.utcnow()
+    product_doc.update(
+        created_at=now,
+        updated_at=now,
+        is_low_stock=is_low_stock(product.quantity, product.low_stock_threshold)
+    )
     
     result = await products_collection.insert_one(product_doc)
+    invalidate("products")
     
     return {"id": str(result.inserted_id), "message": "Product added successfully"}
 
 
 @router.put("/{product_id}")
-async def update_product(product_id: str, updates: dict):
+async def update_product(updates: dict, oid: ObjectId = Depends(product_oid)):
     """Update product details."""
     products_collection = database.get_collection("products")
     
+    check_update_fields(updates)
     updates["updated_at"] = datetime.utcnow()
     
-    # Convert category enum if present
-    if "category" in updates and isinstance(updates["category"], ProductCategory):
-        updates["category"] = updates["category"].value
-    
-    try:
-        result = await products_collection.update_one(
-            {"_id": ObjectId(product_id)},
-            {"$set": updates}
-        )
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid product ID")
+    result = await products_collection.update_one(
+        {"_id": oid},
+        [
+            {"$set": {name: {"$literal": value} for name, value in updates.items()}},
+            LOW_STOCK_FLAG_STAGE
+        ]
+    )
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    invalidate("products")
     return {"message": "Product updated successfully"}
 
 
 @router.put("/{product_id}/stock")
-async def update_stock(product_id: str, quantity_change: int):
+async def update_stock(quantity_change: int, oid: ObjectId = Depends(product_oid)):
     """Update product stock level."""
     products_collection = database.get_collection("products")
     
-    try:
-        result = await products_collection.update_one(
-            {"_id": ObjectId(product_id)},
-            {
-                "$inc": {"quantity": quantity_change},
-                "$set": {"updated_at": datetime.utcnow()}
-            }
-        )
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid product ID")
+    result = await products_collection.update_one(
+        {"_id": oid},
+        stock_change_update(quantity_change, updated_at=datetime.utcnow())
+    )
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    invalidate("products")
+    
     # Check for low stock bottleneck
     from agents.inventory_agent import check_low_stock_bottlenecks
     await check_low_stock_bottlenecks()
@@ -187,16 +193,14 @@ async def update_stock(product_id: str, quantity_change: int):
 
 
 @router.delete("/{product_id}")
-async def delete_product(product_id: str):
+async def delete_product(oid: ObjectId = Depends(product_oid)):
     """Delete a product."""
     products_collection = database.get_collection("products")
     
-    try:
-        result = await products_collection.delete_one({"_id": ObjectId(product_id)})
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid product ID")
+    result = await products_collection.delete_one({"_id": oid})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
     
+    invalidate("products")
     return {"message": "Product deleted successfully"}
@@ -2,14 +2,39 @@
 Orders API routes - Order management endpoints.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, BackgroundTasks, HTTPException
 from database.connection import database
-from database.models import OrderStatus
+from database.models import OrderStatus, ORDER_STATUSES
+from database.queries import ID_TO_STRING_STAGE, ORDER_LIST_PROJECTION, ORDER_TRACKING_PROJECTION
 from datetime import datetime, timedelta
 from bson import ObjectId
+from api.dependencies import is_object_id
+from cache import async_ttl_cache, invalidate
+import asyncio
 
 router = APIRouter(prefix="/api/orders", tags=["Orders"])
 
+# Status values resolved once at import instead of per request
+_PROCESSING = OrderStatus.PROCESSING.value
+_CANCELLED = OrderStatus.CANCELLED.value
+
+# Statuses reported in /stats by_status (keyed by their value)
+_STATS_STATUSES = tuple(s.value for s in (
+    OrderStatus.PENDING,
+    OrderStatus.CONFIRMED,
+    OrderStatus.PROCESSING,
+    OrderStatus.SHIPPED,
+    OrderStatus.DELIVERED,
+    OrderStatus.CANCELLED
+))
+
+
+def _order_filter(order_id: str) -> dict:
+    """Match an order by ObjectId if the string is one, otherwise by order number."""
+    if is_object_id(order_id):
+        return {"_id": ObjectId(order_id)}
+    return {"order_number": order_id}
+
 
 @router.get("")
 async def list_orders(
@@ -24,57 +49,56 @@ async def list_orders(
     if status:
         query["status"] = status
     
-    orders = await orders_collection.find(query).sort(
-        "created_at", -1
-    ).skip(skip).limit(limit).to_list(limit)
-    
-    # Convert ObjectId to string
-    for order in orders:
-        order["_id"] = str(order["_id"])
+    orders = await orders_collection.aggregate([
+        {"$match": query},
+        {"$sort": {"created_at": -1}},
+        {"$skip": skip},
+        {"$limit": limit},
+        {"$project": ORDER_LIST_PROJECTION},
+        ID_TO_STRING_STAGE
+    ]).to_list(limit)
     
     return orders
 
 
 @router.get("/stats")
+@async_ttl_cache(ttl=5, reads=("orders",))
 async def get_order_stats():
     """Get order statistics."""
     orders_collection = database.get_collection("orders")
     
-    # Count by status
-    total = await orders_collection.count_documents({})
-    pending = await orders_collection.count_documents({"status": OrderStatus.PENDING.value})
-    confirmed = await orders_collection.count_documents({"status": OrderStatus.CONFIRMED.value})
-    processing = await orders_collection.count_documents({"status": OrderStatus.PROCESSING.value})
-    shipped = await orders_collection.count_documents({"status": OrderStatus.SHIPPED.value})
-    delivered = await orders_collection.count_documents({"status": OrderStatus.DELIVERED.value})
-    cancelled = await orders_collection.count_documents({"status": OrderStatus.CANCELLED.value})
-    
-    # Orders today
     today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    orders_today = await orders_collection.count_documents({
-        "created_at": {"$gte": today_start}
-    })
-    
-    # Revenue today
-    pipeline = [
-        {"$match": {"created_at": {"$gte": today_start}, "status": {"$ne": OrderStatus.CANCELLED.value}}},
-        {"$group": {"_id": None, "total": {"$sum": "$total_amount"}}}
+    
+    # Count by status in one pass
+    status_pipeline = [{"$group": {"_id": "$status", "n": {"$sum": 1}}}]
+    
+    # Orders and (non-cancelled) revenue today in one pass
+    today_pipeline = [
+        {"$match": {"created_at": {"$gte": today_start}}},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": 1},
+            "revenue": {"$sum": {"$cond": [
+                {"$ne": ["$status", _CANCELLED]},
+                "$total_amount",
+                0
+            ]}}
+        }}
     ]
-    revenue_result = await orders_collection.aggregate(pipeline).to_list(1)
-    revenue_today = revenue_result[0]["total"] if revenue_result else 0
+    
+    status_counts, today = await asyncio.gather(
+        orders_collection.aggregate(status_pipeline).to_list(None),
+        orders_collection.aggregate(today_pipeline).to_list(1)
+    )
+    
+    counts = {c["_id"]: c["n"] for c in status_counts}
+    today = today[0] if today else {}
     
     return {
-        "total": total,
-        "by_status": {
-            "pending": pending,
-            "confirmed": confirmed,
-            "processing": processing,
-            "shipped": shipped,
-            "delivered": delivered,
-            "cancelled": cancelled
-        },
-        "orders_today": orders_today,
-        "revenue_today": revenue_today
+        "total": sum(counts.values()),
+        "by_status": {s: counts.get(s, 0) for s in _STATS_STATUSES},
+        "orders_today": today.get("count", 0),
+        "revenue_today": today.get("revenue", 0)
     }
 
 
@@ -83,11 +107,7 @@ async def get_order(order_id: str):
     """Get order details by ID."""
     orders_collection = database.get_collection("orders")
     
-    try:
-        order = await orders_collection.find_one({"_id": ObjectId(order_id)})
-    except Exception:
-        # Try by order number
-        order = await orders_collection.find_one({"order_number": order_id})
+    order = await orders_collection.find_one(_order_filter(order_id))
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
@@ -97,43 +117,31 @@ async def get_order(order_id: str):
 
 
 @router.put("/{order_id}/status")
-async def update_order_status(order_id: str, status: str):
+async def update_order_status(order_id: str, status: str, background: BackgroundTasks):
     """Update order status."""
     orders_collection = database.get_collection("orders")
     
     # Validate status
-    try:
-        new_status = OrderStatus(status)
-    except ValueError:
+    if status not in ORDER_STATUSES:
         raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
     
-    try:
-        result = await orders_collection.update_one(
-            {"_id": ObjectId(order_id)},
-            {
-                "$set": {
-                    "status": new_status.value,
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
-    except Exception:
-        # Try by order number
-        result = await orders_collection.update_one(
-            {"order_number": order_id},
-            {
-                "$set": {
-                    "status": new_status.value,
-                    "updated_at": datetime.utcnow()
-                }
+    result = await orders_collection.update_one(
+        _order_filter(order_id),
+        {
+            "$set": {
+                "status": status,
+                "updated_at": datetime.utcnow()
             }
-        )
+        }
+    )
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    # If order is being processed, assign to staff
-    if new_status == OrderStatus.PROCESSING:
+    invalidate("orders")
+    
+    # If order is being processed, assign to staff after the response is sent
+    if status == _PROCESSING:
         from agents.workload_agent import assign_task_to_staff
         from agents.state import create_initial_state
         
@@ -144,9 +152,9 @@ async def update_order_status(order_id: str, status: str):
             "order_id": order_id,
             "priority": 2
         }
-        await assign_task_to_staff(state)
+        background.add_task(assign_task_to_staff, state)
     
-    return {"message": f"Order status updated to {new_status.value}"}
+    return {"message": f"Order status updated to {status}"}
 
 
 @router.get("/tracking/{order_number}")
@@ -154,16 +162,14 @@ async def track_order(order_number: str):
     """Track order by order number (for customers)."""
     orders_collection = database.get_collection("orders")
     
-    order = await orders_collection.find_one({"order_number": order_number})
+    # Fetch only the limited info returned to customers
+    order = await orders_collection.find_one(
+        {"order_number": order_number},
+        ORDER_TRACKING_PROJECTION
+    )
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    # Return limited info for customer
-    return {
-        "order_number": order["order_number"],
-        "status": order["status"],
-        "total_amount": order["total_amount"],
-        "estimated_delivery": order.get("estimated_delivery"),
-        "created_at": order["created_at"]
-    }
+    order.setdefault("estimated_delivery", None)
+    return order
@@ -2,28 +2,39 @@
 Staff API routes - Staff and workload management.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from database.connection import database
-from database.models import StaffCreate, TaskStatus
+from database.models import StaffCreate, TaskStatus, TASK_STATUSES
+from database.queries import (
+    ASSIGNED_TASKS_LOOKUP, ID_TO_STRING_STAGE, HAS_CAPACITY_STAGE, workload_change_update
+)
 from agents.workload_agent import get_workload_distribution, complete_task
+from api.dependencies import staff_oid, check_update_fields
+from api.responses import stream_json_array
+from cache import invalidate
 from datetime import datetime
 from bson import ObjectId
 
 router = APIRouter(prefix="/api/staff", tags=["Staff"])
 
+# Status values resolved once at import instead of per request
+_TASK_PENDING = TaskStatus.PENDING.value
+_TASK_COMPLETED = TaskStatus.COMPLETED.value
+
 
 @router.get("")
 async def list_staff():
     """List all staff members."""
     staff_collection = database.get_collection("staff")
     
-    staff = await staff_collection.find().sort("name", 1).to_list(100)
-    
-    # Convert ObjectId to string
-    for s in staff:
-        s["_id"] = str(s["_id"])
+    cursor = staff_collection.aggregate([
+        {"$sort": {"name": 1}},
+        {"$limit": 100},
+        ASSIGNED_TASKS_LOOKUP,
+        ID_TO_STRING_STAGE
+    ])
     
-    return staff
+    return stream_json_array(cursor)
 
 
 @router.get("/workload")
@@ -34,14 +45,15 @@ async def get_workload():
 
 
 @router.get("/{staff_id}")
-async def get_staff_member(staff_id: str):
+async def get_staff_member(oid: ObjectId = Depends(staff_oid)):
     """Get staff member details."""
     staff_collection = database.get_collection("staff")
     
-    try:
-        staff = await staff_collection.find_one({"_id": ObjectId(staff_id)})
-    except Exception:
-        staff = None
+    matches = await staff_collection.aggregate([
+        {"$match": {"_id": oid}},
+        ASSIGNED_TASKS_LOOKUP
+    ]).to_list(1)
+    staff = matches[0] if matches else None
     
     if not staff:
         raise HTTPException(status_code=404, detail="Staff member not found")
@@ -59,62 +71,68 @@ async def add_staff(staff: StaffCreate):
     staff_doc["created_at"] = datetime.utcnow()
     staff_doc["is_available"] = True
     staff_doc["current_workload"] = 0
-    staff_doc["assigned_tasks"] = []
+    staff_doc["has_capacity"] = staff.max_workload > 0
     
     result = await staff_collection.insert_one(staff_doc)
+    invalidate("staff")
     
     return {"id": str(result.inserted_id), "message": "Staff member added successfully"}
 
 
 @router.put("/{staff_id}")
-async def update_staff(staff_id: str, updates: dict):
+async def update_staff(updates: dict, oid: ObjectId = Depends(staff_oid)):
     """Update staff member details."""
     staff_collection = database.get_collection("staff")
     
-    try:
-        result = await staff_collection.update_one(
-            {"_id": ObjectId(staff_id)},
-            {"$set": updates}
-        )
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid staff ID")
+    check_update_fields(updates)
+    
+    result = await staff_collection.update_one(
+        {"_id": oid},
+        [
+            {"$set": {name: {"$literal": value} for name, value in updates.items()}},
+            HAS_CAPACITY_STAGE
+        ]
+    )
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Staff member not found")
     
+    invalidate("staff")
     return {"message": "Staff member updated successfully"}
 
 
 @router.post("/{staff_id}/assign")
-async def assign_task(staff_id: str, description: str, order_id: str = None, priority: int = 1):
+async def assign_task(
+    description: str,
+    order_id: str = None,
+    priority: int = 1,
+    oid: ObjectId = Depends(staff_oid)
+):
     """Assign a task to staff member."""
     staff_collection = database.get_collection("staff")
+    tasks_collection = database.get_collection("tasks")
     
     import uuid
     task_id = f"TASK-{uuid.uuid4().hex[:8].upper()}"
     
-    task = {
+    result = await staff_collection.update_one(
+        {"_id": oid},
+        workload_change_update(1)
+    )
+    
+    if result.modified_count == 0:
+        raise HTTPException(status_code=404, detail="Staff member not found")
+    
+    await tasks_collection.insert_one({
         "task_id": task_id,
+        "staff_id": oid,
         "description": description,
         "order_id": order_id,
-        "status": TaskStatus.PENDING.value,
+        "status": _TASK_PENDING,
         "priority": priority,
         "assigned_at": datetime.utcnow()
-    }
-    
-    try:
-        result = await staff_collection.update_one(
-            {"_id": ObjectId(staff_id)},
-            {
-                "$push": {"assigned_tasks": task},
-                "$inc": {"current_workload": 1}
-            }
-        )
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid staff ID")
-    
-    if result.modified_count == 0:
-        raise HTTPException(status_code=404, detail="Staff member not found")
+    })
+    invalidate("staff")
     
     return {"task_id": task_id, "message": f"Task assigned to staff member"}
 
@@ -127,53 +145,57 @@ async def complete_staff_task(staff_id: str, task_id: str):
 
 
 @router.put("/{staff_id}/tasks/{task_id}/status")
-async def update_task_status(staff_id: str, task_id: str, status: str):
+async def update_task_status(task_id: str, status: str, oid: ObjectId = Depends(staff_oid)):
     """Update task status."""
     staff_collection = database.get_collection("staff")
+    tasks_collection = database.get_collection("tasks")
     
-    try:
-        task_status = TaskStatus(status)
-    except ValueError:
+    if status not in TASK_STATUSES:
         raise HTTPException(status_code=400, detail=f"Invalid status: {status}")
     
     update_data = {
-        "assigned_tasks.$.status": task_status.value
+        "status": status
     }
     
-    if task_status == TaskStatus.COMPLETED:
-        update_data["assigned_tasks.$.completed_at"] = datetime.utcnow()
+    if status == _TASK_COMPLETED:
+        update_data["completed_at"] = datetime.utcnow()
     
-    try:
-        result = await staff_collection.update_one(
-            {"_id": ObjectId(staff_id), "assigned_tasks.task_id": task_id},
-            {"$set": update_data}
-        )
-        
-        if task_status == TaskStatus.COMPLETED:
-            await staff_collection.update_one(
-                {"_id": ObjectId(staff_id)},
-                {"$inc": {"current_workload": -1}}
-            )
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid staff ID or task ID")
+    task_filter = {"staff_id": oid, "task_id": task_id}
+    if status == _TASK_COMPLETED:
+        # Only a real transition to completed frees up workload
+        task_filter["status"] = {"$ne": _TASK_COMPLETED}
     
-    if result.modified_count == 0:
+    result = await tasks_collection.update_one(task_filter, {"$set": update_data})
+    
+    if result.matched_count == 0:
+        # Completing an already-completed task is a no-op, not a missing task
+        if status == _TASK_COMPLETED and await tasks_collection.count_documents(
+            {"staff_id": oid, "task_id": task_id}, limit=1
+        ):
+            return {"message": f"Task status updated to {status}"}
         raise HTTPException(status_code=404, detail="Task not found")
     
+    if status == _TASK_COMPLETED:
+        await staff_collection.update_one(
+            {"_id": oid},
+            workload_change_update(-1)
+        )
+        invalidate("staff")
+    
     return {"message": f"Task status updated to {status}"}
 
 
 @router.delete("/{staff_id}")
-async def delete_staff(staff_id: str):
+async def delete_staff(oid: ObjectId = Depends(staff_oid)):
     """Remove a staff member."""
     staff_collection = database.get_collection("staff")
+    tasks_collection = database.get_collection("tasks")
     
-    try:
-        result = await staff_collection.delete_one({"_id": ObjectId(staff_id)})
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid staff ID")
+    result = await staff_collection.delete_one({"_id": oid})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Staff member not found")
     
+    await tasks_collection.delete_many({"staff_id": oid})
+    invalidate("staff")
     return {"message": "Staff member removed successfully"}
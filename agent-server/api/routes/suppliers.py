@@ -2,14 +2,31 @@
 Suppliers API routes - Supplier management endpoints.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from database.connection import database
 from database.models import SupplierCreate, SupplierResponseRequest, SupplierQueryStatus, OrderStatus
+from database.queries import ID_TO_STRING_STAGE, stock_change_update
+from api.dependencies import supplier_oid
+from api.responses import stream_json_array
+from cache import invalidate
 from datetime import datetime
 from bson import ObjectId
+import asyncio
+import logging
 
 router = APIRouter(prefix="/api/suppliers", tags=["Suppliers"])
 
+logger = logging.getLogger(__name__)
+
+
+async def _query_status_counts(queries_collection, order_id: str) -> dict:
+    """Count an order's supplier queries per status in one scan."""
+    counts = await queries_collection.aggregate([
+        {"$match": {"order_id": order_id}},
+        {"$group": {"_id": "$status", "n": {"$sum": 1}}}
+    ]).to_list(None)
+    return {c["_id"]: c["n"] for c in counts}
+
 
 @router.get("")
 async def list_suppliers(active_only: bool = True):
@@ -20,13 +37,14 @@ async def list_suppliers(active_only: bool = True):
     if active_only:
         query["is_active"] = True
     
-    suppliers = await suppliers_collection.find(query).sort("name", 1).to_list(100)
+    cursor = suppliers_collection.aggregate([
+        {"$match": query},
+        {"$sort": {"name": 1}},
+        {"$limit": 100},
+        ID_TO_STRING_STAGE
+    ])
     
-    # Convert ObjectId to string
-    for supplier in suppliers:
-        supplier["_id"] = str(supplier["_id"])
-    
-    return suppliers
+    return stream_json_array(cursor)
 
 
 @router.get("/pending-queries")
@@ -34,25 +52,59 @@ async def get_all_pending_queries():
     """Get all pending supplier queries across all suppliers."""
     queries_collection = database.get_collection("supplier_queries")
     
-    queries = await queries_collection.find({
-        "status": SupplierQueryStatus.PENDING.value
-    }).sort("created_at", -1).to_list(100)
+    cursor = queries_collection.aggregate([
+        {"$match": {"status": SupplierQueryStatus.PENDING.value}},
+        {"$sort": {"created_at": -1}},
+        {"$limit": 100},
+        ID_TO_STRING_STAGE
+    ])
     
-    for q in queries:
-        q["_id"] = str(q["_id"])
+    return stream_json_array(cursor)
+
+
+@router.get("/pending-queries/summary")
+async def get_pending_queries_summary():
+    """Get pending supplier queries together with per-supplier counts in one round-trip."""
+    queries_collection = database.get_collection("supplier_queries")
     
-    return queries
+    facets = await queries_collection.aggregate([
+        # $match ahead of $facet so the status index is used
+        {"$match": {"status": SupplierQueryStatus.PENDING.value}},
+        {"$facet": {
+            "items": [
+                {"$sort": {"created_at": -1}},
+                {"$limit": 100},
+                ID_TO_STRING_STAGE
+            ],
+            "by_supplier": [
+                {"$group": {
+                    "_id": "$supplier_id",
+                    "supplier_name": {"$first": "$supplier_name"},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"count": -1}},
+                {"$project": {"_id": 0, "supplier_id": "$_id", "supplier_name": 1, "count": 1}}
+            ],
+            "total": [{"$count": "n"}]
+        }}
+    ]).to_list(1)
+    
+    result = facets[0]
+    total = result["total"]
+    
+    return {
+        "items": result["items"],
+        "by_supplier": result["by_supplier"],
+        "total": total[0]["n"] if total else 0
+    }
 
 
 @router.get("/{supplier_id}")
-async def get_supplier(supplier_id: str):
+async def get_supplier(oid: ObjectId = Depends(supplier_oid)):
     """Get supplier details."""
     suppliers_collection = database.get_collection("suppliers")
     
-    try:
-        supplier = await suppliers_collection.find_one({"_id": ObjectId(supplier_id)})
-    except Exception:
-        supplier = None
+    supplier = await suppliers_collection.find_one({"_id": oid})
     
     if not supplier:
         raise HTTPException(status_code=404, detail="Supplier not found")
@@ -81,17 +133,14 @@ async def add_supplier(supplier: SupplierCreate):
 
 
 @router.put("/{supplier_id}")
-async def update_supplier(supplier_id: str, updates: dict):
+async def update_supplier(updates: dict, oid: ObjectId = Depends(supplier_oid)):
     """Update supplier details."""
     suppliers_collection = database.get_collection("suppliers")
     
-    try:
-        result = await suppliers_collection.update_one(
-            {"_id": ObjectId(supplier_id)},
-            {"$set": updates}
-        )
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid supplier ID")
+    result = await suppliers_collection.update_one(
+        {"_id": oid},
+        {"$set": updates}
+    )
     
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Supplier not found")
@@ -100,20 +149,17 @@ async def update_supplier(supplier_id: str, updates: dict):
 
 
 @router.delete("/{supplier_id}")
-async def delete_supplier(supplier_id: str, soft_delete: bool = True):
+async def delete_supplier(soft_delete: bool = True, oid: ObjectId = Depends(supplier_oid)):
     """Delete or deactivate a supplier."""
     suppliers_collection = database.get_collection("suppliers")
     
-    try:
-        if soft_delete:
-            result = await suppliers_collection.update_one(
-                {"_id": ObjectId(supplier_id)},
-                {"$set": {"is_active": False}}
-            )
-        else:
-            result = await suppliers_collection.delete_one({"_id": ObjectId(supplier_id)})
-    except Exception:
-        raise HTTPException(status_code=400, detail="Invalid supplier ID")
+    if soft_delete:
+        result = await suppliers_collection.update_one(
+            {"_id": oid},
+            {"$set": {"is_active": False}}
+        )
+    else:
+        result = await suppliers_collection.delete_one({"_id": oid})
     
     if (soft_delete and result.modified_count == 0) or (not soft_delete and result.deleted_count == 0):
         raise HTTPException(status_code=404, detail="Supplier not found")
@@ -126,17 +172,16 @@ async def get_supplier_chat_history(supplier_id: str, limit: int = 50):
     """Get chat history with a supplier."""
     conversations_collection = database.get_collection("conversations")
     
-    conversations = await conversations_collection.find({
-        "type": "supplier",
-        "supplier_id": supplier_id
-    }).sort("updated_at", -1).limit(limit).to_list(limit)
-    
-    for conv in conversations:
-        conv["_id"] = str(conv["_id"])
+    cursor = conversations_collection.aggregate([
+        {"$match": {"type": "supplier", "supplier_id": supplier_id}},
+        {"$sort": {"updated_at": -1}},
+        {"$limit": limit},
+        ID_TO_STRING_STAGE,
         # Add conversation_id for frontend compatibility
-        conv["conversation_id"] = conv.get("conversation_id", conv["_id"])
+        {"$set": {"conversation_id": {"$ifNull": ["$conversation_id", "$_id"]}}}
+    ])
     
-    return conversations
+    return stream_json_array(cursor)
 
 
 @router.get("/{supplier_id}/queries")
@@ -148,12 +193,14 @@ async def get_supplier_queries(supplier_id: str, status: str = None):
     if status:
         query["status"] = status
     
-    queries = await queries_collection.find(query).sort("created_at", -1).to_list(100)
-    
-    for q in queries:
-        q["_id"] = str(q["_id"])
+    cursor = queries_collection.aggregate([
+        {"$match": query},
+        {"$sort": {"created_at": -1}},
+        {"$limit": 100},
+        ID_TO_STRING_STAGE
+    ])
     
-    return queries
+    return stream_json_array(cursor)
 
 
 @router.put("/{supplier_id}/queries/{query_id}/respond")
@@ -194,6 +241,9 @@ async def supplier_respond_to_stock_query(supplier_id: str, response: SupplierRe
     orders_collection = database.get_collection("orders")
     activities_collection = database.get_collection("agent_activities")
     
+    # One timestamp shared by the query, order and activity writes
+    now = datetime.utcnow()
+    
     # Find the query
     query = await queries_collection.find_one({
         "query_id": response.query_id,
@@ -216,7 +266,7 @@ async def supplier_respond_to_stock_query(supplier_id: str, response: SupplierRe
                 "status": new_status,
                 "response_quantity": response.quantity_available,
                 "response_message": response.message,
-                "responded_at": datetime.utcnow()
+                "responded_at": now
             }
         }
     )
@@ -227,35 +277,36 @@ async def supplier_respond_to_stock_query(supplier_id: str, response: SupplierRe
         quantity_to_add = response.quantity_available
         product_id = query.get("product_id")
         
-        # Update inventory
-        await products_collection.update_one(
-            {"_id": ObjectId(product_id)},
-            {"$inc": {"quantity": quantity_to_add}}
-        )
-        
-        # Check if all pending queries for this order are resolved
         order_id = query.get("order_id")
-        pending_queries = await queries_collection.count_documents({
-            "order_id": order_id,
-            "status": SupplierQueryStatus.PENDING.value
-        })
         
-        # If no more pending queries, check if we have enough stock now
-        order = await orders_collection.find_one({"_id": ObjectId(order_id)})
+        # Update inventory and check remaining pending queries concurrently
+        _, status_counts = await asyncio.gather(
+            products_collection.update_one(
+                {"_id": ObjectId(product_id)},
+                stock_change_update(quantity_to_add)
+            ),
+            _query_status_counts(queries_collection, order_id)
+        )
+        invalidate("products")
+        pending_queries = status_counts.get(SupplierQueryStatus.PENDING.value, 0)
         
-        if order and pending_queries == 0:
+        order_ready = False
+        if pending_queries == 0:
             # Update order status to pending (ready to process)
-            await orders_collection.update_one(
+            order_result = await orders_collection.update_one(
                 {"_id": ObjectId(order_id)},
                 {
                     "$set": {
                         "status": OrderStatus.PENDING.value,
                         "awaiting_supplier": False,
-                        "updated_at": datetime.utcnow()
+                        "updated_at": now
                     }
                 }
             )
-            
+            order_ready = order_result.matched_count > 0
+            invalidate("orders")
+        
+        if order_ready:
             # Log activity
             await activities_collection.insert_one({
                 "agent_name": "order_agent",
@@ -263,7 +314,7 @@ async def supplier_respond_to_stock_query(supplier_id: str, response: SupplierRe
                 "details": f"Order {query.get('order_number')} stock fulfilled by {query.get('supplier_name')}",
                 "order_id": order_id,
                 "conversation_id": query.get("conversation_id"),
-                "timestamp": datetime.utcnow(),
+                "timestamp": now,
                 "success": True
             })
             
@@ -271,20 +322,17 @@ async def supplier_respond_to_stock_query(supplier_id: str, response: SupplierRe
         else:
             result_message = f"Inventory updated with {quantity_to_add} units. Waiting for {pending_queries} more supplier responses."
         
-        print(f"✅ Supplier Response: {query.get('supplier_name')} provided {quantity_to_add} units of {query.get('product_name')}")
+        logger.debug(
+            "Supplier response: %s provided %s units of %s",
+            query.get("supplier_name"), quantity_to_add, query.get("product_name")
+        )
     else:
         # Supplier doesn't have stock
         # Check if all suppliers have responded with unavailable
         order_id = query.get("order_id")
-        pending_queries = await queries_collection.count_documents({
-            "order_id": order_id,
-            "status": SupplierQueryStatus.PENDING.value
-        })
-        
-        available_responses = await queries_collection.count_documents({
-            "order_id": order_id,
-            "status": SupplierQueryStatus.RESPONDED_AVAILABLE.value
-        })
+        status_counts = await _query_status_counts(queries_collection, order_id)
+        pending_queries = status_counts.get(SupplierQueryStatus.PENDING.value, 0)
+        available_responses = status_counts.get(SupplierQueryStatus.RESPONDED_AVAILABLE.value, 0)
         
         if pending_queries == 0 and available_responses == 0:
             # All suppliers responded, none available
@@ -295,7 +343,7 @@ async def supplier_respond_to_stock_query(supplier_id: str, response: SupplierRe
                 "details": f"Order {query.get('order_number')} - No suppliers have the required stock. Order delayed by 7 days.",
                 "order_id": order_id,
                 "conversation_id": query.get("conversation_id"),
-                "timestamp": datetime.utcnow(),
+                "timestamp": now,
                 "success": False
             })
             
@@ -303,7 +351,10 @@ async def supplier_respond_to_stock_query(supplier_id: str, response: SupplierRe
         else:
             result_message = f"Response recorded. Waiting for {pending_queries} more supplier responses."
         
-        print(f"❌ Supplier Response: {query.get('supplier_name')} has no stock of {query.get('product_name')}")
+        logger.debug(
+            "Supplier response: %s has no stock of %s",
+            query.get("supplier_name"), query.get("product_name")
+        )
     
     return {
         "message": "Response recorded successfully",
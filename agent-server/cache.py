@@ -0,0 +1,109 @@
+"""
+In-process caching helpers for frequently polled endpoints.
+"""
+
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+
+
+# cache_clear hooks of cached reads, by the collections they read
+_readers: dict[str, list] = {}
+
+
+def _make_key(args, kwargs) -> tuple:
+    return (args, tuple(sorted(kwargs.items())))
+
+
+def invalidate(*collections: str) -> None:
+    """Clear every cached read of `collections`; writers call this after changing them."""
+    for name in collections:
+        for clear in _readers.get(name, ()):
+            clear()
+
+
+def async_ttl_cache(ttl: float = 5, reads: tuple[str, ...] = ()):
+    """
+    Cache an async function's result per arguments for `ttl` seconds.
+
+    Concurrent callers with the same arguments await the same in-flight
+    call, so N dashboard pollers within a window cost one database hit.
+    Failed calls are not cached. `reads` names the collections the result
+    is built from; `invalidate()` on any of them drops the cached results.
+    """
+    def decorator(func):
+        entries: dict = {}
+        for name in reads:
+            _readers.setdefault(name, []).append(entries.clear)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            now = time.monotonic()
+
+            entry = entries.get(key)
+            if entry is None or entry[0] <= now:
+                entry = (now + ttl, asyncio.ensure_future(func(*args, **kwargs)))
+                entries[key] = entry
+
+            future = entry[1]
+            try:
+                # Shield so one cancelled caller doesn't cancel the shared call
+                return await asyncio.shield(future)
+            except Exception:
+                if entries.get(key) is entry:
+                    del entries[key]
+                raise
+
+        wrapper.cache_clear = entries.clear
+        return wrapper
+
+    return decorator
+
+
+def async_lru_cache(maxsize: int = 2048, ttl: float = 30):
+    """
+    Bounded, write-through variant of `async_ttl_cache`.
+
+    Keeps at most `maxsize` entries, evicting the least recently used.
+    Writers call `wrapper.cache_invalidate(*args)` after changing the
+    underlying document so the next read goes back to the database.
+    `None` results are not cached, so newly created documents show up
+    without waiting for the TTL.
+    """
+    def decorator(func):
+        entries: OrderedDict = OrderedDict()
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = _make_key(args, kwargs)
+            now = time.monotonic()
+
+            entry = entries.get(key)
+            if entry is None or entry[0] <= now:
+                entry = (now + ttl, asyncio.ensure_future(func(*args, **kwargs)))
+                entries[key] = entry
+                if len(entries) > maxsize:
+                    entries.popitem(last=False)
+            entries.move_to_end(key)
+
+            try:
+                result = await asyncio.shield(entry[1])
+            except Exception:
+                if entries.get(key) is entry:
+                    del entries[key]
+                raise
+
+            if result is None and entries.get(key) is entry:
+                del entries[key]
+            return result
+
+        def cache_invalidate(*args, **kwargs):
+            entries.pop(_make_key(args, kwargs), None)
+
+        wrapper.cache_invalidate = cache_invalidate
+        wrapper.cache_clear = entries.clear
+        return wrapper
+
+    return decorator
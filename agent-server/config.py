@@ -4,29 +4,43 @@ Loads environment variables and provides configuration settings.
 """
 
 import os
+from dataclasses import dataclass
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
+@dataclass(frozen=True, slots=True)
 class Settings:
-    """Application settings loaded from environment variables."""
+    """Application settings loaded from environment variables (read once, immutable)."""
     
     # MongoDB
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "msme_db")
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "200"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "20"))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    # zstd/snappy need the zstandard/python-snappy packages; zlib is always available
+    MONGODB_COMPRESSORS: str = os.getenv("MONGODB_COMPRESSORS", "zlib")
     
     # Gemini
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
     
+    # Twilio (REST replies for the WhatsApp webhook; TwiML-only when unset)
+    TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
+    TWILIO_AUTH_TOKEN: str = os.getenv("TWILIO_AUTH_TOKEN", "")
+    TWILIO_WHATSAPP_NUMBER: str = os.getenv("TWILIO_WHATSAPP_NUMBER", "")
+    
     # Server
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "8000"))
     DEBUG: bool = os.getenv("DEBUG", "false").lower() == "true"
     
     # CORS
-    CORS_ORIGINS: list[str] = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    CORS_ORIGINS: tuple[str, ...] = tuple(
+        origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    )
 
 
 settings = Settings()
@@ -4,7 +4,12 @@ Database connection module using Motor for async MongoDB operations.
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 from config import settings
+from pymongo.errors import OperationFailure
+import asyncio
 import certifi
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class Database:
@@ -17,11 +22,94 @@ class Database:
         """Establish connection to MongoDB."""
         self.client = AsyncIOMotorClient(
             settings.MONGODB_URI,
-            tlsCAFile=certifi.where()
+            tlsCAFile=certifi.where(),
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            compressors=settings.MONGODB_COMPRESSORS,
+            retryWrites=True,
+            uuidRepresentation="standard"
         )
         self.db = self.client[settings.DATABASE_NAME]
+        await self.create_indexes()
+        await self.migrate_embedded_tasks()
         print(f"Connected to MongoDB database: {settings.DATABASE_NAME}")
     
+    async def create_indexes(self) -> None:
+        """Create indexes backing hot queries. Safe to run on every startup."""
+        db = self.db
+        
+        await asyncio.gather(
+            # assign_task_to_staff: equality on availability/capacity, ordered by workload
+            self._create_index(db.staff, [("is_available", 1), ("has_capacity", 1), ("current_workload", 1)]),
+            
+            # Order date-range queries (trends, orders today)
+            self._create_index(db.orders, [("created_at", 1)]),
+            # Order listings/counts by status, newest first
+            self._create_index(db.orders, [("status", 1), ("created_at", -1)]),
+            # Order lookups/tracking by order number
+            self._create_index(db.orders, [("order_number", 1)], unique=True),
+            
+            # Tasks: per-staff listings/lookups and unique task_id lookups
+            self._create_index(db.tasks, [("staff_id", 1), ("status", 1)]),
+            self._create_index(db.tasks, [("task_id", 1)], unique=True),
+            
+            # Low-stock listings and counts
+            self._create_index(db.products, [("is_low_stock", 1), ("quantity", 1)]),
+            # Inventory listings and counts by category
+            self._create_index(db.products, [("category", 1)]),
+            
+            # Active supplier listings, sorted by name
+            self._create_index(db.suppliers, [("is_active", 1), ("name", 1)]),
+            # Supplier lookups by category (multikey)
+            self._create_index(db.suppliers, [("categories", 1)]),
+            
+            # Supplier query listings and per-order status counts
+            self._create_index(db.supplier_queries, [("supplier_id", 1), ("status", 1), ("created_at", -1)]),
+            self._create_index(db.supplier_queries, [("order_id", 1), ("status", 1)]),
+            # Supplier query lookups by their public query ID
+            self._create_index(db.supplier_queries, [("query_id", 1)], unique=True),
+            
+            # Recent agent activity feed
+            self._create_index(db.agent_activities, [("timestamp", -1)]),
+            
+            # Conversation lookups by ID and supplier chat listings
+            self._create_index(db.conversations, [("conversation_id", 1)]),
+            self._create_index(db.conversations, [("type", 1), ("supplier_id", 1), ("updated_at", -1)])
+        )
+    
+    async def migrate_embedded_tasks(self) -> None:
+        """Move tasks still embedded in staff.assigned_tasks into the tasks collection."""
+        db = self.db
+        
+        # Nothing to do once every staff document has been migrated
+        if await db.staff.find_one({"assigned_tasks": {"$exists": True}}, {"_id": 1}) is None:
+            return
+        
+        try:
+            # Merging on the unique task_id makes a re-run after an interruption safe
+            await db.staff.aggregate([
+                {"$match": {"assigned_tasks": {"$exists": True}}},
+                {"$unwind": "$assigned_tasks"},
+                {"$replaceWith": {"$mergeObjects": ["$assigned_tasks", {"staff_id": "$_id"}]}},
+                {"$merge": {"into": "tasks", "on": "task_id", "whenMatched": "keepExisting"}}
+            ]).to_list(None)
+        except OperationFailure as e:
+            # e.g. the unique task_id index couldn't be built; keep the embedded tasks
+            logger.error("Embedded task migration failed: %s", e)
+            return
+        
+        await db.staff.update_many({"assigned_tasks": {"$exists": True}}, {"$unset": {"assigned_tasks": ""}})
+    
+    @staticmethod
+    async def _create_index(collection, keys, **kwargs) -> None:
+        """Create an index, logging instead of failing startup if the server rejects it."""
+        try:
+            await collection.create_index(keys, **kwargs)
+        except OperationFailure as e:
+            # e.g. duplicate values under a unique index, or a clashing existing index
+            logger.warning("Skipped index %s on %s: %s", keys, collection.name, e)
+    
     async def disconnect(self) -> None:
         """Close MongoDB connection."""
         if self.client:
@@ -3,37 +3,33 @@ Pydantic models for database collections.
 """
 
 from datetime import datetime
-from enum import Enum
-from typing import Optional
-from pydantic import BaseModel, Field
+from enum import StrEnum
+from typing import Annotated, Optional
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field
 from bson import ObjectId
 
 
-class PyObjectId(str):
-    """Custom type for MongoDB ObjectId."""
-    
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-    
-    @classmethod
-    def validate(cls, v, info=None):
-        if isinstance(v, ObjectId):
-            return str(v)
-        if isinstance(v, str):
-            return v
-        raise ValueError("Invalid ObjectId")
+def _validate_object_id(v):
+    if isinstance(v, ObjectId):
+        return str(v)
+    if isinstance(v, str):
+        return v
+    raise ValueError("Invalid ObjectId")
+
+
+# MongoDB ObjectId, validated and stored as its hex string
+PyObjectId = Annotated[str, BeforeValidator(_validate_object_id)]
 
 
 # ============ ENUMS ============
 
-class ProductCategory(str, Enum):
+class ProductCategory(StrEnum):
     JEWELRY = "jewelry"
     KITCHEN_APPLIANCES = "kitchen_appliances"
     MAKEUP = "makeup"
 
 
-class OrderStatus(str, Enum):
+class OrderStatus(StrEnum):
     PENDING = "pending"
     CONFIRMED = "confirmed"
     PROCESSING = "processing"
@@ -43,21 +39,21 @@ class OrderStatus(str, Enum):
     CANCELLED = "cancelled"
 
 
-class TaskStatus(str, Enum):
+class TaskStatus(StrEnum):
     PENDING = "pending"
     IN_PROGRESS = "in_progress"
     COMPLETED = "completed"
     BLOCKED = "blocked"
 
 
-class BottleneckSeverity(str, Enum):
+class BottleneckSeverity(StrEnum):
     LOW = "low"
     MEDIUM = "medium"
     HIGH = "high"
     CRITICAL = "critical"
 
 
-class BottleneckType(str, Enum):
+class BottleneckType(StrEnum):
     INVENTORY_SHORTAGE = "inventory_shortage"
     WORKLOAD_IMBALANCE = "workload_imbalance"
     SUPPLIER_DELAY = "supplier_delay"
@@ -65,37 +61,46 @@ class BottleneckType(str, Enum):
     STAFF_UNAVAILABLE = "staff_unavailable"
 
 
-class ConversationType(str, Enum):
+class ConversationType(StrEnum):
     CONSUMER = "consumer"
     SUPPLIER = "supplier"
 
 
-class SupplierQueryStatus(str, Enum):
+class SupplierQueryStatus(StrEnum):
     PENDING = "pending"
     RESPONDED_AVAILABLE = "available"
     RESPONDED_UNAVAILABLE = "unavailable"
     EXPIRED = "expired"
 
 
+# Member sets for membership checks; StrEnum members hash like their values,
+# so raw strings from requests and documents can be tested directly
+ORDER_STATUSES = frozenset(OrderStatus)
+TASK_STATUSES = frozenset(TaskStatus)
+
+
 # ============ MODELS ============
+# Document models aren't validated on request paths, so their schemas are
+# built on first use (defer_build) rather than at import. Enum fields are
+# stored in Mongo as plain strings, not enum instances, so models with enum
+# fields set use_enum_values to hold those strings too.
 
 class Product(BaseModel):
     """Product in inventory."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     name: str
     category: ProductCategory
     description: str
     price: float
     quantity: int
     low_stock_threshold: int = 5
+    is_low_stock: bool = False  # Materialized quantity <= low_stock_threshold
     supplier_id: Optional[str] = None
     image_url: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, use_enum_values=True, defer_build=True)
 
 
 class ProductCreate(BaseModel):
@@ -117,6 +122,8 @@ class OrderItem(BaseModel):
     quantity: int
     unit_price: float
     total_price: float
+    
+    model_config = ConfigDict(defer_build=True)
 
 
 class CustomerInfo(BaseModel):
@@ -128,11 +135,13 @@ class CustomerInfo(BaseModel):
     city: str
     pincode: str
     notes: Optional[str] = None
+    
+    model_config = ConfigDict(defer_build=True)
 
 
 class Order(BaseModel):
     """Customer order."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     order_number: str
     customer_info: CustomerInfo
     items: list[OrderItem]
@@ -144,29 +153,25 @@ class Order(BaseModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     estimated_delivery: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, use_enum_values=True, defer_build=True)
 
 
 class Supplier(BaseModel):
     """Supplier information."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     name: str
     contact_person: str
     phone: str
     email: str
     address: str
     categories: list[ProductCategory]
-    products_offered: list[str] = []
+    products_offered: list[str] = Field(default_factory=list)
     avg_response_time_hours: float = 24.0
     reliability_score: float = 0.8
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, use_enum_values=True, defer_build=True)
 
 
 class SupplierCreate(BaseModel):
@@ -177,23 +182,26 @@ class SupplierCreate(BaseModel):
     email: str
     address: str
     categories: list[ProductCategory]
-    products_offered: list[str] = []
+    products_offered: list[str] = Field(default_factory=list)
 
 
 class StaffTask(BaseModel):
-    """Task assigned to staff."""
+    """Task assigned to staff (stored in the tasks collection)."""
     task_id: str
+    staff_id: Optional[ObjectId] = None  # Stored as the staff document's ObjectId
     description: str
     order_id: Optional[str] = None
     status: TaskStatus = TaskStatus.PENDING
     priority: int = 1
     assigned_at: datetime = Field(default_factory=datetime.utcnow)
     completed_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(use_enum_values=True, arbitrary_types_allowed=True, defer_build=True)
 
 
 class Staff(BaseModel):
     """Staff member."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     name: str
     role: str
     phone: str
@@ -201,13 +209,12 @@ class Staff(BaseModel):
     is_available: bool = True
     current_workload: int = 0
     max_workload: int = 10
-    assigned_tasks: list[StaffTask] = []
-    skills: list[str] = []
+    has_capacity: bool = True  # Materialized current_workload < max_workload
+    assigned_tasks: list[StaffTask] = Field(default_factory=list)
+    skills: list[str] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
 
 
 class StaffCreate(BaseModel):
@@ -217,7 +224,7 @@ class StaffCreate(BaseModel):
     phone: str
     email: Optional[str] = None
     max_workload: int = 10
-    skills: list[str] = []
+    skills: list[str] = Field(default_factory=list)
 
 
 class Message(BaseModel):
@@ -225,47 +232,45 @@ class Message(BaseModel):
     role: str  # "user", "assistant", "system"
     content: str
     timestamp: datetime = Field(default_factory=datetime.utcnow)
-    metadata: dict = {}
+    metadata: dict = Field(default_factory=dict)
+    
+    model_config = ConfigDict(defer_build=True)
 
 
 class Conversation(BaseModel):
     """Conversation session."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     type: ConversationType
     supplier_id: Optional[str] = None
     customer_phone: Optional[str] = None
-    messages: list[Message] = []
-    context: dict = {}
+    messages: list[Message] = Field(default_factory=list)
+    context: dict = Field(default_factory=dict)
     is_active: bool = True
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, use_enum_values=True, defer_build=True)
 
 
 class BottleneckEvent(BaseModel):
     """Operational bottleneck event."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     type: BottleneckType
     severity: BottleneckSeverity
     title: str
     description: str
-    affected_resources: list[str] = []
-    suggested_actions: list[str] = []
+    affected_resources: list[str] = Field(default_factory=list)
+    suggested_actions: list[str] = Field(default_factory=list)
     is_resolved: bool = False
     detected_at: datetime = Field(default_factory=datetime.utcnow)
     resolved_at: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, use_enum_values=True, defer_build=True)
 
 
 class AgentActivity(BaseModel):
     """Record of agent activity."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     agent_name: str
     action: str
     details: str
@@ -275,14 +280,12 @@ class AgentActivity(BaseModel):
     duration_ms: Optional[int] = None
     success: bool = True
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, defer_build=True)
 
 
 class SupplierQuery(BaseModel):
     """Query sent to supplier for stock availability."""
-    id: Optional[str] = Field(default=None, alias="_id")
+    id: Optional[PyObjectId] = Field(default=None, alias="_id")
     query_id: str  # Unique ID for this query
     order_id: str  # The order that triggered this query
     order_number: str
@@ -300,9 +303,7 @@ class SupplierQuery(BaseModel):
     responded_at: Optional[datetime] = None
     expires_at: Optional[datetime] = None
     
-    class Config:
-        populate_by_name = True
-        json_encoders = {ObjectId: str}
+    model_config = ConfigDict(populate_by_name=True, use_enum_values=True, defer_build=True)
 
 
 # ============ API RESPONSE MODELS ============
@@ -317,7 +318,7 @@ class ChatResponse(BaseModel):
     """Response from chat endpoint."""
     response: str
     conversation_id: str
-    context: dict = {}
+    context: dict = Field(default_factory=dict)
 
 
 class SupplierChatRequest(BaseModel):
@@ -346,6 +347,8 @@ class WorkloadDistribution(BaseModel):
     current_tasks: int
     max_capacity: int
     utilization_percent: float
+    
+    model_config = ConfigDict(defer_build=True)
 
 
 class SupplierResponseRequest(BaseModel):
@@ -0,0 +1,103 @@
+"""
+MongoDB query and pipeline helpers shared by routes and agents.
+"""
+
+
+# ============ QUERY HELPERS ============
+
+# Final pipeline stage rendering _id as a string for API responses
+ID_TO_STRING_STAGE = {"$set": {"_id": {"$toString": "$_id"}}}
+
+
+# ============ INVENTORY HELPERS ============
+
+# Aggregation expression backing Product.is_low_stock
+LOW_STOCK_EXPR = {"$lte": ["$quantity", "$low_stock_threshold"]}
+
+# Pipeline-update stage that refreshes the materialized is_low_stock flag
+LOW_STOCK_FLAG_STAGE = {"$set": {"is_low_stock": LOW_STOCK_EXPR}}
+
+# Product fields rendered by the dashboard's inventory views
+PRODUCT_LIST_PROJECTION = {
+    "name": 1,
+    "category": 1,
+    "description": 1,
+    "price": 1,
+    "quantity": 1,
+    "low_stock_threshold": 1,
+    "supplier_id": 1
+}
+
+
+def is_low_stock(quantity: int, low_stock_threshold: int) -> bool:
+    """Compute is_low_stock for a product document built in Python."""
+    return quantity <= low_stock_threshold
+
+
+def stock_change_update(quantity_change: int, **fields) -> list:
+    """Pipeline update applying a stock delta and refreshing is_low_stock."""
+    stage = {"quantity": {"$add": ["$quantity", quantity_change]}}
+    stage.update({name: {"$literal": value} for name, value in fields.items()})
+    return [{"$set": stage}, LOW_STOCK_FLAG_STAGE]
+
+
+# ============ ORDER HELPERS ============
+
+# Order fields rendered by the dashboard's order list (items kept only for counts/names)
+ORDER_LIST_PROJECTION = {
+    "order_number": 1,
+    "customer_info.name": 1,
+    "customer_info.phone": 1,
+    "items.product_name": 1,
+    "items.quantity": 1,
+    "total_amount": 1,
+    "status": 1,
+    "assigned_staff_id": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "estimated_delivery": 1
+}
+
+# Order fields exposed to customers tracking an order
+ORDER_TRACKING_PROJECTION = {
+    "_id": 0,
+    "order_number": 1,
+    "status": 1,
+    "total_amount": 1,
+    "estimated_delivery": 1,
+    "created_at": 1
+}
+
+
+# ============ STAFF TASK HELPERS ============
+
+# Aggregation expression backing Staff.has_capacity
+HAS_CAPACITY_EXPR = {
+    "$lt": [{"$ifNull": ["$current_workload", 0]}, {"$ifNull": ["$max_workload", 10]}]
+}
+
+# Pipeline-update stage that refreshes the materialized has_capacity flag
+HAS_CAPACITY_STAGE = {"$set": {"has_capacity": HAS_CAPACITY_EXPR}}
+
+
+def workload_change_update(workload_change: int) -> list:
+    """Pipeline update applying a workload delta and refreshing has_capacity."""
+    return [
+        {"$set": {"current_workload": {"$add": [{"$ifNull": ["$current_workload", 0]}, workload_change]}}},
+        HAS_CAPACITY_STAGE
+    ]
+
+
+# Joins a staff member's tasks back in as assigned_tasks for API responses
+ASSIGNED_TASKS_LOOKUP = {
+    "$lookup": {
+        "from": "tasks",
+        "localField": "_id",
+        "foreignField": "staff_id",
+        "pipeline": [
+            {"$sort": {"assigned_at": 1}},
+            {"$project": {"_id": 0, "staff_id": 0}}
+        ],
+        "as": "assigned_tasks"
+    }
+}
@@ -2,11 +2,14 @@
 MSME Agent Server - FastAPI Application Entry Point
 """
 
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from config import settings
 from database.connection import database
+from api.responses import MongoJSONResponse
+from cache import async_ttl_cache
 
 # Import routers
 from api.routes.chat import router as chat_router
@@ -18,6 +21,11 @@ from api.routes.analytics import router as analytics_router
 from api.routes.leads import router as leads_router
 from whatsapp import router as whatsapp_router
 
+logging.basicConfig(
+    level=logging.DEBUG if settings.DEBUG else logging.INFO,
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -39,7 +47,8 @@ app = FastAPI(
     title="MSME Decision-Centric AI Agent System",
     description="LLM-powered agent orchestration for MSME operations",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=MongoJSONResponse
 )
 
 # Configure CORS
@@ -82,15 +91,20 @@ async def root():
     }
 
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint."""
+@async_ttl_cache(ttl=2)
+async def _database_status() -> str:
+    """Ping the database; probes within the TTL share one ping."""
     try:
-        # Check database connection
         await database.db.command("ping")
-        db_status = "connected"
+        return "connected"
     except Exception:
-        db_status = "disconnected"
+        return "disconnected"
+
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint."""
+    db_status = await _database_status()
     
     return {
         "status": "healthy" if db_status == "connected" else "degraded",
@@ -0,0 +1,46 @@
+"""
+One-off migration: backfill the materialized is_low_stock and has_capacity flags.
+
+Products and staff written before these flags existed don't have them, so they
+are missing from low-stock listings and task assignment until this has run.
+Only documents without the flag are touched, so re-running it is safe.
+"""
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+import os
+import certifi
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "msme_db")
+TLS_CA_FILE = certifi.where()
+
+# Same expressions as database/queries.py, which keeps the flags current on every write
+LOW_STOCK_FLAG_STAGE = {"$set": {"is_low_stock": {"$lte": ["$quantity", "$low_stock_threshold"]}}}
+HAS_CAPACITY_STAGE = {"$set": {"has_capacity": {
+    "$lt": [{"$ifNull": ["$current_workload", 0]}, {"$ifNull": ["$max_workload", 10]}]
+}}}
+
+
+async def backfill_flags():
+    """Set is_low_stock on products and has_capacity on staff where they are missing."""
+    print(f"Connecting to MongoDB at {MONGODB_URI}...")
+    client = AsyncIOMotorClient(MONGODB_URI, tlsCAFile=TLS_CA_FILE)
+    db = client[DATABASE_NAME]
+    
+    products, staff = await asyncio.gather(
+        db.products.update_many({"is_low_stock": {"$exists": False}}, [LOW_STOCK_FLAG_STAGE]),
+        db.staff.update_many({"has_capacity": {"$exists": False}}, [HAS_CAPACITY_STAGE])
+    )
+    
+    print(f"\n✅ Backfilled {products.modified_count} products and {staff.modified_count} staff members!")
+    
+    client.close()
+    print("\nDone!")
+
+
+if __name__ == "__main__":
+    asyncio.run(backfill_flags())
@@ -3,7 +3,8 @@ Populate all collections at once.
 """
 
 import asyncio
-from populate_inventory import populate_inventory
+from motor.motor_asyncio import AsyncIOMotorClient
+from populate_inventory import populate_inventory, MONGODB_URI, DATABASE_NAME, TLS_CA_FILE
 from populate_suppliers import populate_suppliers
 from populate_staff import populate_staff
 
@@ -14,17 +15,23 @@ async def populate_all():
     print("POPULATING MSME DATABASE")
     print("=" * 50)
     
-    print("\n📦 Populating Inventory...")
+    print("\n📦 Populating Inventory, 🏭 Suppliers and 👥 Staff...")
     print("-" * 50)
-    await populate_inventory()
     
-    print("\n🏭 Populating Suppliers...")
-    print("-" * 50)
-    await populate_suppliers()
+    # One client (and connection pool) shared by every populator
+    print(f"Connecting to MongoDB at {MONGODB_URI}...")
+    client = AsyncIOMotorClient(MONGODB_URI, tlsCAFile=TLS_CA_FILE)
+    db = client[DATABASE_NAME]
     
-    print("\n👥 Populating Staff...")
-    print("-" * 50)
-    await populate_staff()
+    # Each populator writes its own collections, so they can run side by side
+    try:
+        await asyncio.gather(
+            populate_inventory(db),
+            populate_suppliers(db),
+            populate_staff(db)
+        )
+    finally:
+        client.close()
     
     print("\n" + "=" * 50)
     print("✅ ALL DATA POPULATED SUCCESSFULLY!")
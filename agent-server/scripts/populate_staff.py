@@ -4,8 +4,11 @@ Populate staff collection with sample team members.
 
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from datetime import datetime
 import os
+import orjson
+from pathlib import Path
 import certifi
 from dotenv import load_dotenv
 
@@ -15,115 +18,69 @@ MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "msme_db")
 TLS_CA_FILE = certifi.where()
 
+# Skip server-side schema validation for trusted seed data (dev databases only)
+SEED_FAST = bool(os.getenv("SEED_FAST"))
 
-STAFF = [
-    {
-        "name": "Arjun Sharma",
-        "role": "Order Manager",
-        "phone": "+91 98765 11111",
-        "email": "arjun@msme.com",
-        "max_workload": 12,
-        "skills": ["order_processing", "customer_service", "inventory_management"]
-    },
-    {
-        "name": "Priya Patel",
-        "role": "Inventory Specialist",
-        "phone": "+91 98765 22222",
-        "email": "priya@msme.com",
-        "max_workload": 10,
-        "skills": ["inventory_management", "stock_counting", "supplier_coordination"]
-    },
-    {
-        "name": "Rahul Verma",
-        "role": "Packaging & Shipping",
-        "phone": "+91 98765 33333",
-        "email": "rahul@msme.com",
-        "max_workload": 15,
-        "skills": ["packaging", "shipping", "quality_check"]
-    },
-    {
-        "name": "Sneha Gupta",
-        "role": "Customer Representative",
-        "phone": "+91 98765 44444",
-        "email": "sneha@msme.com",
-        "max_workload": 8,
-        "skills": ["customer_service", "complaint_handling", "order_tracking"]
-    },
-    {
-        "name": "Vikram Singh",
-        "role": "Supplier Coordinator",
-        "phone": "+91 98765 55555",
-        "email": "vikram@msme.com",
-        "max_workload": 10,
-        "skills": ["supplier_coordination", "procurement", "negotiation"]
-    },
-    {
-        "name": "Meera Joshi",
-        "role": "Quality Control",
-        "phone": "+91 98765 66666",
-        "email": "meera@msme.com",
-        "max_workload": 12,
-        "skills": ["quality_check", "product_inspection", "returns_handling"]
-    },
-    {
-        "name": "Amit Kumar",
-        "role": "Warehouse Assistant",
-        "phone": "+91 98765 77777",
-        "email": "amit@msme.com",
-        "max_workload": 15,
-        "skills": ["warehousing", "stock_organization", "inventory_management"]
-    },
-    {
-        "name": "Kavita Reddy",
-        "role": "Accounts & Billing",
-        "phone": "+91 98765 88888",
-        "email": "kavita@msme.com",
-        "max_workload": 10,
-        "skills": ["billing", "invoicing", "payment_tracking"]
-    },
-]
 
+# Seed data, loaded when the populator runs
+STAFF_FIXTURE = Path(__file__).parent / "fixtures" / "staff.json"
 
-async def populate_staff():
+
+async def populate_staff(db=None):
     """Populate the staff collection with sample team members."""
-    print(f"Connecting to MongoDB at {MONGODB_URI}...")
-    client = AsyncIOMotorClient(MONGODB_URI, tlsCAFile=TLS_CA_FILE)
-    db = client[DATABASE_NAME]
+    client = None
+    if db is None:
+        print(f"Connecting to MongoDB at {MONGODB_URI}...")
+        client = AsyncIOMotorClient(MONGODB_URI, tlsCAFile=TLS_CA_FILE)
+        db = client[DATABASE_NAME]
     staff_collection = db["staff"]
+    staff_members = orjson.loads(STAFF_FIXTURE.read_bytes())
     
-    # Clear existing staff (optional)
-    existing_count = await staff_collection.count_documents({})
-    if existing_count > 0:
-        print(f"Found {existing_count} existing staff members. Clearing...")
-        await staff_collection.delete_many({})
-    
-    # Add timestamps and defaults
-    staff_with_defaults = []
-    for staff in STAFF:
-        staff_copy = staff.copy()
-        staff_copy["created_at"] = datetime.utcnow()
-        staff_copy["is_available"] = True
-        staff_copy["current_workload"] = 0
-        staff_copy["assigned_tasks"] = []
-        staff_with_defaults.append(staff_copy)
+    # Upsert by email so re-runs keep existing _ids
+    now = datetime.utcnow()
+    operations = [
+        UpdateOne(
+            {"email": staff["email"]},
+            {
+                "$set": {
+                    **staff,
+                    "is_available": True,
+                    "current_workload": 0,
+                    "has_capacity": staff["max_workload"] > 0
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True
+        )
+        for staff in staff_members
+    ]
+    result = await staff_collection.bulk_write(
+        operations,
+        ordered=False,
+        bypass_document_validation=SEED_FAST
+    )
     
-    # Insert staff
-    result = await staff_collection.insert_many(staff_with_defaults)
+    # Seeded staff start with no tasks; other staff keep theirs, matching their workload
+    seeded_ids = await staff_collection.distinct(
+        "_id", {"email": {"$in": [staff["email"] for staff in staff_members]}}
+    )
+    await db["tasks"].delete_many({"staff_id": {"$in": seeded_ids}})
     
-    print(f"\n✅ Successfully added {len(result.inserted_ids)} staff members!")
+    print(f"\n✅ Added {result.upserted_count} and refreshed {result.matched_count} staff members!")
     
     # Print summary by role
     print("\nStaff Summary:")
     print("-" * 40)
     
-    for staff in STAFF:
+    for staff in staff_members:
         print(f"  {staff['name']} - {staff['role']} (Max: {staff['max_workload']} tasks)")
     
     # Calculate total capacity
-    total_capacity = sum(s["max_workload"] for s in STAFF)
+    total_capacity = sum(s["max_workload"] for s in staff_members)
     print(f"\nTotal Team Capacity: {total_capacity} tasks")
     
-    client.close()
+    if client is not None:
+        client.close()
     print("\nDone!")
 
 
@@ -15,6 +15,9 @@ MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "msme_db")
 TLS_CA_FILE = certifi.where()
 
+# Skip server-side schema validation for trusted seed data (dev databases only)
+SEED_FAST = bool(os.getenv("SEED_FAST"))
+
 
 SUPPLIERS = [
     # Jewelry Suppliers
@@ -172,29 +175,31 @@ SUPPLIERS = [
 ]
 
 
-async def populate_suppliers():
+async def populate_suppliers(db=None):
     """Populate the suppliers collection with sample data."""
-    print(f"Connecting to MongoDB at {MONGODB_URI}...")
-    client = AsyncIOMotorClient(MONGODB_URI, tlsCAFile=TLS_CA_FILE)
-    db = client[DATABASE_NAME]
+    client = None
+    if db is None:
+        print(f"Connecting to MongoDB at {MONGODB_URI}...")
+        client = AsyncIOMotorClient(MONGODB_URI, tlsCAFile=TLS_CA_FILE)
+        db = client[DATABASE_NAME]
     suppliers_collection = db["suppliers"]
     
     # Clear existing suppliers (optional)
-    existing_count = await suppliers_collection.count_documents({})
+    existing_count = await suppliers_collection.estimated_document_count()
     if existing_count > 0:
         print(f"Found {existing_count} existing suppliers. Clearing...")
         await suppliers_collection.delete_many({})
     
-    # Add timestamps and active status
-    suppliers_with_timestamps = []
-    for supplier in SUPPLIERS:
-        supplier_copy = supplier.copy()
-        supplier_copy["created_at"] = datetime.utcnow()
-        supplier_copy["is_active"] = True
-        suppliers_with_timestamps.append(supplier_copy)
+    # Insert suppliers with timestamps and active status, built as they're sent
+    now = datetime.utcnow()
+    result = await suppliers_collection.insert_many(
+        ({**supplier, "created_at": now, "is_active": True} for supplier in SUPPLIERS),
+        ordered=False,
+        bypass_document_validation=SEED_FAST
+    )
     
-    # Insert suppliers
-    result = await suppliers_collection.insert_many(suppliers_with_timestamps)
+    # Same categories index the server creates at startup
+    await suppliers_collection.create_index([("categories", 1)])
     
     print(f"\n✅ Successfully added {len(result.inserted_ids)} suppliers!")
     
@@ -202,12 +207,20 @@ async def populate_suppliers():
     print("\nSuppliers Summary:")
     print("-" * 40)
     
+    # Supplier count per category in one aggregation
+    pipeline = [
+        {"$unwind": "$categories"},
+        {"$group": {"_id": "$categories", "count": {"$sum": 1}}}
+    ]
+    counts = {d["_id"]: d["count"] async for d in suppliers_collection.aggregate(pipeline)}
+    
     for category in ["jewelry", "kitchen_appliances", "makeup"]:
-        count = await suppliers_collection.count_documents({"categories": category})
+        count = counts.get(category, 0)
         category_name = category.replace("_", " ").title()
         print(f"  {category_name}: {count} suppliers")
     
-    client.close()
+    if client is not None:
+        client.close()
     print("\nDone!")
 
 
@@ -3,19 +3,100 @@ WhatsApp Bot Integration using Twilio
 Routes WhatsApp messages to the existing agent system
 """
 
-from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Request, Form, HTTPException
 from fastapi.responses import Response
+from twilio.rest import Client
+from twilio.http.async_http_client import AsyncTwilioHttpClient
 from twilio.twiml.messaging_response import MessagingResponse
 from agents.graph import run_agent
+from config import settings
 from database.connection import database
-import traceback
+import functools
+import logging
 
 router = APIRouter(prefix="/whatsapp", tags=["WhatsApp"])
+logger = logging.getLogger(__name__)
+
+ERROR_REPLY = "Sorry, I encountered an error. Please try again in a moment."
+
+# Twilio rejects WhatsApp bodies over 1600 characters; leave some headroom
+WHATSAPP_MESSAGE_LIMIT = 1500
+
+
+@functools.lru_cache(maxsize=1)
+def get_twilio_client():
+    """Get the shared async Twilio REST client, or None if credentials aren't configured."""
+    if not (settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_WHATSAPP_NUMBER):
+        return None
+    return Client(
+        settings.TWILIO_ACCOUNT_SID,
+        settings.TWILIO_AUTH_TOKEN,
+        http_client=AsyncTwilioHttpClient()
+    )
+
+
+def split_message(text: str, limit: int = WHATSAPP_MESSAGE_LIMIT) -> list[str]:
+    """Split a reply into WhatsApp-sized parts, breaking at line or sentence ends where possible."""
+    parts = []
+    while len(text) > limit:
+        window = text[:limit]
+        cut = max(window.rfind("\n"), window.rfind(". "), window.rfind("! "), window.rfind("? "))
+        if cut <= 0:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = limit - 1
+        parts.append(text[:cut + 1].rstrip())
+        text = text[cut + 1:].lstrip()
+    if text:
+        parts.append(text)
+    return parts
+
+
+def twiml_response(message: str = None) -> Response:
+    """Build a TwiML response, optionally replying with a message (split if too long)."""
+    response = MessagingResponse()
+    if message:
+        for part in split_message(message):
+            response.message(part)
+    
+    return Response(
+        content=str(response),
+        media_type="application/xml"
+    )
+
+
+async def process_and_reply(to: str, body: str, conversation_id: str):
+    """Run the agent for an incoming message and send the reply through the Twilio REST API."""
+    client = get_twilio_client()
+    
+    try:
+        result = await run_agent(
+            message=body,
+            conversation_id=conversation_id,
+            conversation_type="consumer"
+        )
+        reply = result["response"]
+        logger.debug("Agent response: %.100s", reply)
+    except Exception:
+        logger.exception("WhatsApp agent error")
+        reply = ERROR_REPLY
+    
+    # Send parts one after another so they arrive in order
+    try:
+        for part in split_message(reply):
+            await client.messages.create_async(
+                from_=settings.TWILIO_WHATSAPP_NUMBER,
+                to=to,
+                body=part
+            )
+    except Exception:
+        logger.exception("WhatsApp send error")
 
 
 @router.post("/webhook")
 async def whatsapp_webhook(
     request: Request,
+    background: BackgroundTasks,
     From: str = Form(...),
     Body: str = Form(...),
     ProfileName: str = Form(None),
@@ -25,6 +106,11 @@ async def whatsapp_webhook(
     Twilio WhatsApp webhook endpoint.
     Receives messages from WhatsApp users and responds via agent system.
     
+    When Twilio REST credentials are configured, the webhook is acknowledged
+    immediately and the agent's reply is sent once ready, keeping agent
+    latency clear of Twilio's webhook timeout. Otherwise the reply is
+    returned inline as TwiML.
+    
     From: WhatsApp number (e.g., whatsapp:+1234567890)
     Body: Message text
     ProfileName: WhatsApp user's name
@@ -37,7 +123,12 @@ async def whatsapp_webhook(
         # Use phone number as conversation ID for continuity
         conversation_id = f"wa_{phone_number.replace('+', '')}"
         
-        print(f"📱 WhatsApp message from {ProfileName or phone_number}: {Body}")
+        logger.debug("WhatsApp message from %s: %s", ProfileName or phone_number, Body)
+        
+        # Acknowledge now and reply after the response is sent
+        if get_twilio_client() is not None:
+            background.add_task(process_and_reply, From, Body, conversation_id)
+            return twiml_response()
         
         # Process message through agent system
         result = await run_agent(
@@ -46,30 +137,16 @@ async def whatsapp_webhook(
             conversation_type="consumer"
         )
         
-        # Create Twilio response
-        response = MessagingResponse()
-        response.message(result["response"])
-        
-        print(f"🤖 Agent response: {result['response'][:100]}...")
+        logger.debug("Agent response: %.100s", result["response"])
         
         # Return TwiML response
-        return Response(
-            content=str(response),
-            media_type="application/xml"
-        )
+        return twiml_response(result["response"])
         
-    except Exception as e:
-        print(f"❌ WhatsApp webhook error: {e}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("WhatsApp webhook error")
         
         # Send error message to user
-        response = MessagingResponse()
-        response.message("Sorry, I encountered an error. Please try again in a moment.")
-        
-        return Response(
-            content=str(response),
-            media_type="application/xml"
-        )
+        return twiml_response(ERROR_REPLY)
 
 
 @router.get("/status")
@@ -79,4 +156,4 @@ async def whatsapp_status():
         "status": "active",
         "service": "WhatsApp Bot via Twilio",
         "webhook_endpoint": "/whatsapp/webhook"
-    }
\ No newline at end of file
+    }